@@ -1,23 +1,59 @@
 #!/usr/bin/env python
-import os
-import tarfile
+import logging
+import multiprocessing
+import timeit
+import zlib
+from collections import OrderedDict
 
 from mongoengine import connect
+from mongoengine.connection import get_db
 from pympler import asizeof
 
 from pycoshark.mongomodels import Project, VCSSystem, File, Commit, FileAction, Issue, IssueSystem, Refactoring, Hunk
 from pycoshark.utils import create_mongodb_uri_string, git_tag_filter, get_affected_versions, java_filename_filter, jira_is_resolved_and_fixed
 
+from util.cache import LRUCache
+from util.checkpoint import Checkpoint
 from util.git import CollectGit
+from util.index import CommitIndex, FileActionIndex
+from util.repository import extract_archive, repository_path
+from util.suspects import classify_suspects, unclassified_type
+from util.writer import InducingWriter
+
+
+# commit field which contains the issues for each bug-fixing label
+LABEL_ISSUE_FIELDS = {
+    'validated_bugfix': 'fixed_issue_ids',
+    'adjustedszz_bugfix': 'szz_issue_ids',
+    'issueonly_bugfix': 'linked_issue_ids',
+    'issuefasttext_bugfix': 'linked_issue_ids',
+}
+
+# collection which holds the processed bug-fixing commits of every configuration for incremental runs
+STATE_COLLECTION = 'inducing_state'
+
+# defaults for the parameters of a configuration, see InducingMiner.write_bug_inducing
+DEFAULT_CONFIGURATION = {
+    'label': 'validated_bugfix',
+    'inducing_strategy': 'code_only',
+    'java_only': True,
+    'affected_versions': False,
+    'ignore_refactorings': True,
+    'name': None,
+    'only_validated_bugfix_lines': False,
+}
 
 
 class InducingMiner:
     """Mine inducing commits with the help of CollectGit and blame."""
 
-    def __init__(self, logger, database, user, password, host, port, authentication, ssl, project_name, vcs_url, repo_path, repo_from_db=False):
+    def __init__(self, logger, database, user, password, host, port, authentication, ssl, project_name, vcs_url, repo_path, repo_from_db=False, cache_dir=None, repository_cache=None):
         self._log = logger
         self._repo_path = repo_path
+        self._cache_dir = cache_dir
         self._project_name = project_name
+        self._vcs_url = vcs_url
+        self._connection = (database, user, password, host, port, authentication, ssl)
 
         uri = create_mongodb_uri_string(user, password, host, port, authentication, ssl)
         connect(database, host=uri)
@@ -40,51 +76,154 @@ class InducingMiner:
 
         # we need to extract the repository from the MongoDB
         if repo_from_db:
-            self.extract_repository(vcs, repo_path, project_name)
+            self.extract_repository(vcs, repo_path, project_name, repository_cache)
 
-    def extract_repository(self, vcs, target_path, project_name):
+    def extract_repository(self, vcs, target_path, project_name, repository_cache=None):
+        """Extract the repository archive of the vcs from the GridFS.
+
+        :param RepositoryCache repository_cache: if set, the repository is extracted into the cache and reused by later runs, target_path is ignored
+        """
         # fetch file
         repository = vcs.repository_file
-        if not target_path.endswith('/'):
-            target_path += '/'
-
         if repository.grid_id is None:
             raise Exception('no repository file for project!')
 
-        fname = '{}.tar.gz'.format(project_name)
+        if repository_cache is None:
+            self._repo_path = self._extract_archive(repository.get(), target_path, vcs.url)
+        else:
+            gridout = repository.get()
+            key = '{}-{}'.format(repository.grid_id, getattr(gridout, 'md5', None) or gridout.length)
+            self._repo_path = repository_cache.get(key)
+            if self._repo_path is None:
+                self._repo_path = repository_cache.put(key, lambda path: self._extract_archive(gridout, path, vcs.url))
+            else:
+                self._log.info('reusing extracted repository from cache')
+        self._log.info('using path %s', self._repo_path)
+
+    def _extract_archive(self, gridout, target_path, vcs_url):
+        """Extract the archive and return the path of the repository."""
+        if not target_path.endswith('/'):
+            target_path += '/'
 
-        # extract from gridfs
-        with open(fname, 'wb') as f:
-            f.write(repository.read())
+        # the archive is extracted while it is read from the gridfs chunk by chunk
+        top_level = extract_archive(gridout, target_path)
 
-        # extract tarfile
-        with tarfile.open(fname, "r:gz") as tar_gz:
-            tar_gz.extractall(target_path)
+        repo_path = repository_path(target_path, top_level)
+        if repo_path is None:
+            # fall back to the name of the repository in the url
+            repo_name = vcs_url.split('/')[-1].split('.')[0]
+            repo_path = '{}{}/'.format(target_path, repo_name)
+        return repo_path
 
-        # TODO: this will probably not work in every case
-        repo_name = vcs.url.split('/')[-1].split('.')[0]
-        self._repo_path = '{}{}/'.format(target_path, repo_name)
-        self._log.info('using path %s', self._repo_path)
+    def collect(self, clear_labels=None, clear=True):
+        """Collect inducing commits and write them to the database.
 
-        # remove tarfile
-        os.remove(fname)
+        :param list clear_labels: if set, only induces entries with one of these labels are removed beforehand, otherwise all of them
+        :param bool clear: remove induces entries, incremental runs keep them
+        """
+        self._prepare()
+        if clear:
+            self._clear_inducing(clear_labels)
 
-    def collect(self):
-        """Collect inducing commits and write them to the database."""
-        self._cg = CollectGit(self._repo_path)
+    def _prepare(self):
+        """Collect the repository information and version dates needed for mining."""
+        self._cg = CollectGit(self._repo_path, cache_dir=self._cache_dir)
         self._cg.collect()
 
+        self._commits = self._build_commit_index()
+        self._file_actions = FileActionIndex(FileAction._get_collection(), File._get_collection_name())
+
+        # the tags and their dates only depend on the project, the boundary dates only on the issues
+        self._tags = git_tag_filter(self._project_name, discard_patch=False, correct_broken_tags=True)
+        self._tag_dates = self._collect_tag_dates()
+        self._boundary_dates = {}
+
+        # lines of refactorings per FileAction for bug-fixing commits
+        self._refactorings = LRUCache(10000)
+
+        # bug-fixing commits, their issues and the per commit and label filtered issues
+        self._bugfix_commits = {}
+        self._issue_docs = {}
+        self._resolved = {}
+        self._commit_issues = {}
+
         self._version_dates = self._collect_version_dates()
-        self._clear_inducing()
 
-    def _clear_inducing(self):
-        """Delete all inducing information from the dtabse for the chosen project."""
-        self._log.info('setting all FileAction.induces to []')
-        for c in Commit.objects.filter(vcs_system_id=self._vcs_id).only('id'):
-            for fa in FileAction.objects.filter(commit_id=c.id):
-                fa.induces = []  # this deletes everything, including previous runs with a different label
-                fa.save()
-        self._log.info('finished setting all FileAction.induces to []')
+    def _build_commit_index(self):
+        """Load id, committer_date and bug-fixing labels of all commits of the VCS system into a CommitIndex."""
+        start = timeit.default_timer()
+        labels = sorted(LABEL_ISSUE_FIELDS.keys())
+        fields = ['id', 'revision_hash', 'committer_date'] + ['labels.{}'.format(label) for label in labels]
+
+        index = CommitIndex(labels, fallback=self._fetch_commit)
+        for c in Commit.objects.filter(vcs_system_id=self._vcs_id).only(*fields).as_pymongo().timeout(False):
+            index.add(c['revision_hash'], c['_id'], c.get('committer_date'), c.get('labels'))
+
+        self._log.info('loaded %s commits into the commit index in %.5fs', len(index), timeit.default_timer() - start)
+        return index
+
+    def _fetch_commit(self, revision_hash):
+        """Fallback for commits which are not in the commit index."""
+        c = Commit.objects.only('id', 'committer_date', 'labels').get(vcs_system_id=self._vcs_id, revision_hash=revision_hash)
+        return c.id, c.committer_date, c.labels
+
+    def _clear_inducing(self, labels=None, batch_size=10000):
+        """Delete inducing information from the database for the chosen project.
+
+        The FileActions are updated server side in batches of commits instead of loading and saving each one.
+        The state of incremental runs for the labels is removed first so that an interrupted full run is not continued incrementally.
+
+        :param list labels: only remove induces entries with one of these labels, if None everything is removed
+        :param int batch_size: number of commits for which the FileActions are updated with one query
+        :rtype: int
+        :returns: number of modified FileActions
+        """
+        start = timeit.default_timer()
+        if labels is None:
+            self._log.info('setting all FileAction.induces to []')
+            update = {'$set': {'induces': []}}  # this deletes everything, including previous runs with a different label
+        else:
+            self._log.info('removing FileAction.induces with labels %s', labels)
+            update = {'$pull': {'induces': {'label': {'$in': list(labels)}}}}
+
+        # the previous results are no longer complete, incremental runs have to start over
+        state_query = {'vcs_system_id': self._vcs_id}
+        if labels is not None:
+            state_query['name'] = {'$in': list(labels)}
+        get_db()[STATE_COLLECTION].delete_many(state_query)
+
+        commit_ids = self._vcs_commit_ids()
+
+        modified = 0
+        for i in range(0, len(commit_ids), batch_size):
+            res = FileAction.objects.filter(commit_id__in=commit_ids[i:i + batch_size], induces__0__exists=True).update(__raw__=update, full_result=True)
+            modified += res.modified_count
+
+        self._log.info('finished clearing FileAction.induces for %s commits, modified %s FileActions in %.5fs', len(commit_ids), modified, timeit.default_timer() - start)
+        return modified
+
+    def _vcs_commit_ids(self):
+        """Return the ids of all commits of the VCS system."""
+        return [c['_id'] for c in Commit.objects.filter(vcs_system_id=self._vcs_id).only('id').as_pymongo().timeout(False)]
+
+    def _tag_date(self, tag):
+        """Return the committer date of the revision of a tag from git_tag_filter."""
+        # the tag could point to a revision with a wrong date (e.g., via faulty subversion to git migrations)
+        # in those cases git_tag_filter provides a corrected hash which we can use
+        rev = tag['revision']
+        if 'corrected_revision' in tag.keys():
+            rev = tag['corrected_revision']
+        return self._commits.get(rev).committer_date
+
+    def _collect_tag_dates(self):
+        """Map lower case tag names to their original names and committer dates."""
+        tag_dates = {}
+        for tag in self._tags:
+            name = tag['original'].lower()
+            if name not in tag_dates.keys():
+                tag_dates[name] = []
+            tag_dates[name].append((tag['original'], self._tag_date(tag)))
+        return tag_dates
 
     def _find_boundary_date(self, issues, version_dates, affected_versions):
         """Find suspect boundary date.
@@ -93,8 +232,15 @@ class InducingMiner:
 
         - latest creation date of linked bugs
         - earliest affected version
+
+        The result only depends on the issues and affected_versions, it is memoized for the lifetime of the miner.
         """
-        tags = git_tag_filter(self._project_name, discard_patch=False, correct_broken_tags=True)
+        key = (frozenset(issue.id for issue in issues), affected_versions)
+        if key not in self._boundary_dates.keys():
+            self._boundary_dates[key] = self._compute_boundary_date(issues, version_dates, affected_versions)
+        return self._boundary_dates[key]
+
+    def _compute_boundary_date(self, issues, version_dates, affected_versions):
         issue_dates = []
         affected_version_dates = []
         for issue in issues:
@@ -105,15 +251,9 @@ class InducingMiner:
 
             # direct link match, broken dates are already filtered in pycoshark so we do not need to do that here
             for av in issue.affects_versions:
-                for tag in tags:
-                    if av.lower() == tag['original'].lower():
-                        rev = tag['revision']
-                        if 'corrected_revision' in tag.keys():
-                            rev = tag['corrected_revision']
-
-                        c = Commit.objects(vcs_system_id=self._vcs_id, revision_hash=rev).only('committer_date').get()
-                        affected_version_dates.append(c.committer_date)
-                        self._log.debug('found direct link between tag: {} and affected version: {} using '.format(tag['original'], av))
+                for original, tag_date in self._tag_dates.get(av.lower(), []):
+                    affected_version_dates.append(tag_date)
+                    self._log.debug('found direct link between tag: {} and affected version: {} using '.format(original, av))
 
             for av in get_affected_versions(issue, self._project_name, self._jira_key):
                 avt = tuple(av)
@@ -148,18 +288,10 @@ class InducingMiner:
         3.0.0 from ITS matches 3.0.0 from VCS
         3.0 from ITS matches all of 3.0.X from VCS
         """
-        tags = git_tag_filter(self._project_name, discard_patch=False, correct_broken_tags=True)
-
         # collect tags and their version and date used in this VCS system
         tag_versions = {}
-        for t in tags:
-            # the tag could point to a revision with a wrong date (e.g., via faulty subversion to git migrations)
-            # in those cases git_tag_filter provides a corrected hash which we can use
-            rev = t['revision']
-            if 'corrected_revision' in t.keys():
-                rev = t['corrected_revision']
-            c = Commit.objects.get(vcs_system_id=self._vcs_id, revision_hash=rev)
-            tag_versions[tuple([str(tv) for tv in t['version']])] = c.committer_date
+        for t in self._tags:
+            tag_versions[tuple([str(tv) for tv in t['version']])] = self._tag_date(t)
 
         # collect affected versions used in this ITS
         affected_versions = set()
@@ -183,17 +315,42 @@ class InducingMiner:
     def refactoring_lines(self, commit_id, file_action_id):
         """Return lines from one file in one commit which are detected as Refactorings by rMiner.
         """
-        lines = []
-        for r in Refactoring.objects.filter(commit_id=commit_id, detection_tool='rMiner'):
+        lines = self._refactorings.get(commit_id)
+        if lines is None:
+            lines = self._commit_refactoring_lines(commit_id)
+            self._refactorings.put(commit_id, lines)
+        return lines.get(file_action_id, [])
+
+    def _commit_refactoring_lines(self, commit_id):
+        """Return lines of all files in one commit which are detected as Refactorings by rMiner.
+
+        The Refactorings and their Hunks are loaded with one query each.
+
+        :rtype: dict
+        :returns: list of (start_line, end_line) tuples for each FileAction id
+        """
+        refactoring_hunks = []
+        for r in Refactoring.objects.filter(commit_id=commit_id, detection_tool='rMiner').only('hunks'):
             for h in r.hunks:
                 # we skip added refactoring positions as they can not be blamed later
                 if h['mode'].lower() == 'a':
                     continue
-
-                # todo: only include before refactorings as we only blame (ofc) deleted lines
-                h2 = Hunk.objects.get(id=h['hunk_id'])
-                if h2.file_action_id == file_action_id:
-                    lines.append((h['start_line'], h['end_line']))
+                refactoring_hunks.append(h)
+
+        if not refactoring_hunks:
+            return {}
+
+        # todo: only include before refactorings as we only blame (ofc) deleted lines
+        hunk_file_actions = {}
+        for h2 in Hunk.objects.filter(id__in=list(set(h['hunk_id'] for h in refactoring_hunks))).only('id', 'file_action_id'):
+            hunk_file_actions[h2.id] = h2.file_action_id
+
+        lines = {}
+        for h in refactoring_hunks:
+            file_action_id = hunk_file_actions.get(h['hunk_id'])
+            if file_action_id not in lines.keys():
+                lines[file_action_id] = []
+            lines[file_action_id].append((h['start_line'], h['end_line']))
         return lines
 
     def bug_fixing_lines(self, file_action_id):
@@ -234,99 +391,388 @@ class InducingMiner:
 
         return bugfix_lines_added, bugfix_lines_deleted
 
-    def write_bug_inducing(self, label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name=None, only_validated_bugfix_lines=False):
+    def write_bug_inducing(self, label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name=None, only_validated_bugfix_lines=False, write_batch_size=1000):
         """Write bug inducing information into FileAction.
 
         1. get all commits that are bug-fixing
         2. run blame for all files for all deleted lines in bug-fixing commits to find bug-inducing file actions and commits
-        3. save to mongo_db
+        3. save to mongo_db, entries are added per inducing FileAction in batches of write_batch_size updates
+        """
+        configuration = {'label': label,
+                         'inducing_strategy': inducing_strategy,
+                         'java_only': java_only,
+                         'affected_versions': affected_versions,
+                         'ignore_refactorings': ignore_refactorings,
+                         'name': name,
+                         'only_validated_bugfix_lines': only_validated_bugfix_lines}
+        self.write_bug_inducing_multi([configuration], write_batch_size=write_batch_size)
+
+    def write_bug_inducing_multi(self, configurations, write_batch_size=1000, processes=1, incremental=False, checkpoint=None, resume=False):
+        """Write bug inducing information for multiple configurations into FileAction.
+
+        Every configuration is a dict with the parameters of write_bug_inducing, missing parameters use the same defaults.
+        All configurations are mined in one pass over the bug-fixing commits, see mine_bug_inducing.
+
+        The processed bug-fixing commits and the labeled commits of every configuration are recorded. In incremental mode
+        only bug-fixing commits which were not processed before are mined. Only the inducing FileActions which get new changes,
+        lose changes of commits which are no longer bug-fixing commits or belong to commits whose label changed are updated.
+        Configurations without previous state or with changed parameters are mined completely.
+        Other changes of processed commits, e.g., of their issues, are only picked up by a complete run.
+
+        The checkpoint is removed after all changes are written, see mine_bug_inducing for checkpoint and resume.
         """
-        params = {
-            'vcs_system_id': self._vcs_id,
-            'labels__{}'.format(label): True,
-            'parents__1__exists': False,
-        }
-
-        # depending on our label we restrict the selection to commits that contain linked issues in the respective list
-        if label == 'validated_bugfix':
-            params['fixed_issue_ids__0__exists'] = True
-        elif label == 'adjustedszz_bugfix':
-            params['szz_issue_ids__0__exists'] = True
-        elif label == 'issueonly_bugfix':
-            params['linked_issue_ids__0__exists'] = True
-        elif label == 'issuefasttext_bugfix':
-            params['linked_issue_ids__0__exists'] = True
+        configurations = [dict(DEFAULT_CONFIGURATION, **c) for c in configurations]
+
+        commit_labels = self._bugfix_commit_ids(configurations)
+        candidates = {c['name']: [commit_id for commit_id, labels in commit_labels.items() if c['label'] in labels] for c in configurations}
+        labeled = {label: self._labeled_commit_ids(label) for label in set(c['label'] for c in configurations)}
+
+        if not incremental:
+            all_changes = self.mine_bug_inducing(configurations, processes=processes, commit_names=self._commit_names(configurations, commit_labels), checkpoint=checkpoint, resume=resume)
+            for configuration in configurations:
+                self._write_changes(all_changes[configuration['name']], configuration['name'], write_batch_size)
+
         else:
-            raise Exception('unknown label')
+            state = self._load_state(configurations)
+            for configuration in configurations:
+                if state[configuration['name']] is None:
+                    self._log.info('no previous state for %s, mining all bug-fixing commits', configuration['name'])
+                    self._clear_inducing([configuration['name']])
+                    state[configuration['name']] = (set(), labeled[configuration['label']])
+
+            processed = {name: commit_ids for name, (commit_ids, _) in state.items()}
+            all_changes = self.mine_bug_inducing(configurations, processes=processes, commit_names=self._commit_names(configurations, commit_labels, processed), checkpoint=checkpoint, resume=resume)
+            for configuration in configurations:
+                commit_ids, previous_labeled = state[configuration['name']]
+                current_labeled = labeled[configuration['label']]
+                self._update_changes(all_changes[configuration['name']], configuration['name'], commit_ids - set(candidates[configuration['name']]),
+                                     current_labeled - previous_labeled, previous_labeled - current_labeled, write_batch_size)
+
+        self._save_state(configurations, candidates, labeled)
+
+        if checkpoint is not None:
+            checkpoint.remove()
+
+    def mine_shard(self, configurations, shard, shards, checkpoint, processes=1, resume=False):
+        """Mine the changes of one shard of the bug-fixing commits for multiple configurations without writing them.
+
+        The bug-fixing commits are partitioned by a hash of their id, every shard mines one partition. The changes are written
+        to the checkpoint file, write_bug_inducing_shards combines the files of all shards and writes the changes.
+
+        :param int shard: number of the shard, 0 <= shard < shards
+        :param int shards: number of shards
+        :param Checkpoint checkpoint: checkpoint which contains the changes of the shard after mining
+        """
+        configurations = [dict(DEFAULT_CONFIGURATION, **c) for c in configurations]
 
-        all_changes = {}
+        commit_names = self._commit_names(configurations, self._bugfix_commit_ids(configurations))
+        commit_names = OrderedDict((commit_id, names) for commit_id, names in commit_names.items() if shard_of(commit_id, shards) == shard)
+        self._log.info('mining shard %s of %s', shard, shards)
+        self.mine_bug_inducing(configurations, processes=processes, commit_names=commit_names, checkpoint=checkpoint, resume=resume)
 
-        # fetch before instead of iterate over the cursor because of timeout
-        bugfix_commit_ids = [c.id for c in Commit.objects.filter(**params).only('id').timeout(False)]  # maybe list comprehension will close the cursor
-        for bugfix_commit_id in bugfix_commit_ids:
+    def write_bug_inducing_shards(self, configurations, paths, write_batch_size=1000):
+        """Combine the changes of all shards and write them like write_bug_inducing_multi.
 
-            bugfix_commit = Commit.objects.only('revision_hash', 'id', 'fixed_issue_ids', 'szz_issue_ids', 'linked_issue_ids', 'committer_date').get(id=bugfix_commit_id)
+        The suspects are classified over the changes of all shards. The shards have to cover all current bug-fixing commits.
 
-            # only modified files
-            for fa in FileAction.objects.filter(commit_id=bugfix_commit.id, mode='M').timeout(False):
-                f = File.objects.get(id=fa.file_id)
+        :param list paths: files written by mine_shard for the same configurations
+        """
+        configurations = [dict(DEFAULT_CONFIGURATION, **c) for c in configurations]
+
+        commit_labels = self._bugfix_commit_ids(configurations)
+        candidates = {c['name']: [commit_id for commit_id, labels in commit_labels.items() if c['label'] in labels] for c in configurations}
+        labeled = {label: self._labeled_commit_ids(label) for label in set(c['label'] for c in configurations)}
+
+        processed = set()
+        all_changes = {c['name']: OrderedDict() for c in configurations}
+        for path in paths:
+            loaded = Checkpoint(path).load(str(self._vcs_id), configurations)
+            if loaded is None:
+                raise Exception('shard {} was not mined for this project and these configurations'.format(path))
+
+            shard_processed, shard_changes = loaded
+            processed.update(shard_processed)
+            for name, changes in shard_changes.items():
+                for key, values in changes.items():
+                    if key not in all_changes[name].keys():
+                        all_changes[name][key] = values
+
+        missing = set(self._commit_names(configurations, commit_labels).keys()) - processed
+        if missing:
+            raise Exception('shards do not contain {} bug-fixing commits'.format(len(missing)))
 
-                # only java files
-                if java_only and not java_filename_filter(f.path.lower()):
+        self._clear_inducing()
+        for configuration in configurations:
+            self._write_changes(all_changes[configuration['name']], configuration['name'], write_batch_size)
+        self._save_state(configurations, candidates, labeled)
+
+    def _labeled_commit_ids(self, label):
+        """Return the ids of all commits with label, these are partial fixes if they are blamed as suspects."""
+        return set(c['_id'] for c in Commit.objects.filter(**{'vcs_system_id': self._vcs_id, 'labels__{}'.format(label): True}).only('id').as_pymongo().timeout(False))
+
+    def _load_state(self, configurations):
+        """Return the processed bug-fixing commit ids and the labeled commit ids of the previous run for each configuration name.
+
+        The state is None if the configuration was not processed before with the same parameters.
+        """
+        state = {c['name']: None for c in configurations}
+        for doc in get_db()[STATE_COLLECTION].find({'vcs_system_id': self._vcs_id, 'name': {'$in': list(state.keys())}}):
+            for configuration in configurations:
+                if configuration['name'] == doc['name'] and configuration == doc['configuration']:
+                    state[doc['name']] = (set(doc['commit_ids']), set(doc['labeled_commit_ids']))
+        return state
+
+    def _save_state(self, configurations, processed, labeled):
+        """Record the processed bug-fixing commit ids and the labeled commit ids for each configuration."""
+        for configuration in configurations:
+            get_db()[STATE_COLLECTION].update_one({'vcs_system_id': self._vcs_id, 'name': configuration['name']},
+                                                  {'$set': {'configuration': configuration,
+                                                            'commit_ids': list(processed[configuration['name']]),
+                                                            'labeled_commit_ids': list(labeled[configuration['label']])}},
+                                                  upsert=True)
+
+    def _commit_names(self, configurations, commit_labels, processed=None):
+        """Return the names of the configurations which have to be mined for each bug-fixing commit.
+
+        :param OrderedDict commit_labels: bug-fixing commit ids with their labels, see _bugfix_commit_ids
+        :param dict processed: commit ids which are skipped for each configuration name
+        :rtype: OrderedDict
+        """
+        commit_names = OrderedDict()
+        for commit_id, labels in commit_labels.items():
+            names = set(c['name'] for c in configurations if c['label'] in labels and (processed is None or commit_id not in processed[c['name']]))
+            if names:
+                commit_names[commit_id] = names
+        return commit_names
+
+    def _bugfix_commit_ids(self, configurations):
+        """Return the ids of all candidate bug-fixing commits for the configurations together with the labels each commit matches."""
+        commit_labels = OrderedDict()
+        for label in sorted(set(c['label'] for c in configurations)):
+            if label not in LABEL_ISSUE_FIELDS.keys():
+                raise Exception('unknown label')
+
+            # depending on our label we restrict the selection to commits that contain linked issues in the respective list
+            params = {
+                'vcs_system_id': self._vcs_id,
+                'labels__{}'.format(label): True,
+                'parents__1__exists': False,
+                '{}__0__exists'.format(LABEL_ISSUE_FIELDS[label]): True,
+            }
+
+            # fetch before instead of iterate over the cursor because of timeout
+            for c in Commit.objects.filter(**params).only('id').as_pymongo().timeout(False):
+                if c['_id'] not in commit_labels.keys():
+                    commit_labels[c['_id']] = set()
+                commit_labels[c['_id']].add(label)
+        return commit_labels
+
+    def mine_bug_inducing(self, configurations, processes=1, commit_names=None, checkpoint=None, resume=False):
+        """Mine bug inducing changes for multiple configurations in one pass.
+
+        Every candidate bug-fixing commit of the union of all configurations is visited only once.
+        Commits, FileActions, Files, issues, boundary dates and blame results are computed once
+        and then filtered for every configuration which contains the commit.
+
+        With more than one process the bug-fixing commits are distributed over a pool of worker processes,
+        each with its own database connection and CollectGit. The results are merged in the order
+        of the bug-fixing commits so that they do not depend on the number of processes.
+
+        With a checkpoint the processed bug-fixing commits and the changes so far are saved periodically and after the last commit.
+        If resume is set the changes of the checkpoint are used and only the remaining bug-fixing commits are mined, in the same
+        order as without interruption. Checkpoints of other configurations or with commits which are no longer bug-fixing commits are ignored.
+
+        :param list configurations: list of configuration dicts with all parameters of write_bug_inducing
+        :param int processes: number of worker processes
+        :param OrderedDict commit_names: bug-fixing commit ids with the names of the configurations which are mined for them,
+                                         by default all bug-fixing commits of the configurations
+        :param Checkpoint checkpoint: checkpoint which is written while mining
+        :param bool resume: continue from the checkpoint
+        :rtype: dict
+        :returns: all changes for each configuration name
+        """
+        names = [c['name'] for c in configurations]
+        if len(set(names)) != len(names):
+            raise Exception('configuration names have to be unique')
+
+        all_changes = {name: OrderedDict() for name in names}
+
+        if commit_names is None:
+            commit_names = self._commit_names(configurations, self._bugfix_commit_ids(configurations))
+
+        processed = []
+        if checkpoint is not None and resume:
+            loaded = checkpoint.load(str(self._vcs_id), configurations)
+            if loaded is None:
+                self._log.warning('no checkpoint for these configurations, starting from the beginning')
+            elif not set(loaded[0]).issubset(commit_names.keys()):
+                self._log.warning('checkpoint contains commits which are no longer bug-fixing commits, starting from the beginning')
+            else:
+                processed, all_changes = loaded
+                done = set(processed)
+                commit_names = OrderedDict((commit_id, commit_config_names) for commit_id, commit_config_names in commit_names.items() if commit_id not in done)
+                self._log.info('resuming from checkpoint with %s processed bug-fixing commits', len(processed))
+
+        self._log.info('mining %s bug-fixing commits for configurations %s', len(commit_names), names)
+
+        if processes > 1:
+            # loggers can not be pickled before python 3.7, the workers get theirs by name
+            worker_args = (self._log.name, self._connection, self._project_name, self._vcs_url, self._repo_path, self._cache_dir, configurations, list(commit_names.keys()))
+            with multiprocessing.get_context('spawn').Pool(processes, initializer=_init_worker, initargs=worker_args) as pool:
+                self._merge_changes(all_changes, zip(commit_names.keys(), pool.imap(_mine_commit_worker, commit_names.items(), chunksize=8)), processed, checkpoint, configurations)
+        else:
+            self._prefetch_issues(list(commit_names.keys()))
+            self._merge_changes(all_changes, ((bugfix_commit_id, self._mine_commit(bugfix_commit_id, [c for c in configurations if c['name'] in commit_config_names])) for bugfix_commit_id, commit_config_names in commit_names.items()), processed, checkpoint, configurations)
+
+        if checkpoint is not None:
+            checkpoint.save(str(self._vcs_id), configurations, processed, all_changes)
+
+        for name in names:
+            self._log.info('size of all changes for %s: %s mb', name, asizeof.asizeof(all_changes[name]) / 1024 / 1024)
+        return all_changes
+
+    def _merge_changes(self, all_changes, commit_changes, processed, checkpoint=None, configurations=None):
+        """Merge the changes of each bug-fixing commit into all_changes, the first change for a key wins.
+
+        :param commit_changes: iterable of bug-fixing commit ids with their changes
+        :param list processed: the merged bug-fixing commit ids are appended
+        :param Checkpoint checkpoint: written when due
+        """
+        for bugfix_commit_id, changes in commit_changes:
+            for name, config_changes in changes.items():
+                for key, values in config_changes.items():
+                    if key not in all_changes[name].keys():
+                        all_changes[name][key] = values
+            processed.append(bugfix_commit_id)
+
+            if checkpoint is not None and checkpoint.due():
+                self._log.info('writing checkpoint after %s bug-fixing commits', len(processed))
+                checkpoint.save(str(self._vcs_id), configurations, processed, all_changes)
+
+    def _prefetch_issues(self, bugfix_commit_ids):
+        """Load the bug-fixing commits and all of their issues in bulk.
+
+        The commits are fetched with one query, the issues of all bug-fixing labels with one $in query.
+        """
+        fields = sorted(set(LABEL_ISSUE_FIELDS.values()))
+        for c in Commit.objects.filter(id__in=bugfix_commit_ids).only('revision_hash', 'id', 'committer_date', *fields).timeout(False):
+            self._bugfix_commits[c.id] = c
+
+        issue_ids = set()
+        for c in self._bugfix_commits.values():
+            for field in fields:
+                issue_ids.update(getattr(c, field))
+        issue_ids.difference_update(self._issue_docs.keys())
+
+        for issue in Issue.objects.filter(id__in=list(issue_ids)).only('id', 'external_id', 'created_at', 'affects_versions', 'issue_type', 'issue_type_verified', 'status', 'resolution').timeout(False):
+            self._issue_docs[issue.id] = issue
+        self._log.info('loaded %s bug-fixing commits and %s issues', len(self._bugfix_commits), len(self._issue_docs))
+
+    def _bugfix_commit(self, bugfix_commit_id):
+        """Return the prefetched bug-fixing commit, fetches it if it was not prefetched."""
+        if bugfix_commit_id not in self._bugfix_commits.keys():
+            self._bugfix_commits[bugfix_commit_id] = Commit.objects.only('revision_hash', 'id', 'fixed_issue_ids', 'szz_issue_ids', 'linked_issue_ids', 'committer_date').get(id=bugfix_commit_id)
+        return self._bugfix_commits[bugfix_commit_id]
+
+    def _issue(self, issue_id):
+        """Return the issue from the prefetched issues, fetches unknown issues, returns None if it does not exist."""
+        if issue_id not in self._issue_docs.keys():
+            try:
+                self._issue_docs[issue_id] = Issue.objects.get(id=issue_id)
+            except Issue.DoesNotExist:
+                self._issue_docs[issue_id] = None
+        return self._issue_docs[issue_id]
+
+    def _is_resolved_and_fixed(self, issue):
+        """Cached jira_is_resolved_and_fixed, it may need to query all events of the issue."""
+        if issue.id not in self._resolved.keys():
+            self._resolved[issue.id] = jira_is_resolved_and_fixed(issue)
+        return self._resolved[issue.id]
+
+    def _issues(self, bugfix_commit, label):
+        """Return issues for the label of the bug-fixing commit which are really closed and fixed.
+
+        The result is cached per commit and label.
+        """
+        key = (bugfix_commit.id, label)
+        if key not in self._commit_issues.keys():
+            self._commit_issues[key] = self._filter_issues(bugfix_commit, label)
+        return self._commit_issues[key]
+
+    def _filter_issues(self, bugfix_commit, label):
+        fixed_issue_ids = getattr(bugfix_commit, LABEL_ISSUE_FIELDS[label])
+
+        # only issues that are really closed and fixed:
+        issues = []
+        for issue_id in fixed_issue_ids:
+            issue = self._issue(issue_id)
+            if issue is None:
+                continue
+
+            # issueonly_bugfix considers linked_issue_ids, those may contain non-bugs
+            if label in ['issueonly_bugfix', 'adjustedszz_bugfix', 'issuefasttext_bugfix'] and str(issue.issue_type).lower() != 'bug':
+                continue
+
+            if not self._is_resolved_and_fixed(issue):
+                continue
+
+            if label == 'validated_bugfix':
+                if not issue.issue_type_verified or issue.issue_type_verified.lower() != 'bug':
                     continue
 
-                if label == 'validated_bugfix':
-                    fixed_issue_ids = bugfix_commit.fixed_issue_ids
-                elif label == 'adjustedszz_bugfix':
-                    fixed_issue_ids = bugfix_commit.szz_issue_ids
-                elif label == 'issueonly_bugfix':
-                    fixed_issue_ids = bugfix_commit.linked_issue_ids
-                elif label == 'issuefasttext_bugfix':
-                    fixed_issue_ids = bugfix_commit.linked_issue_ids
-                else:
-                    raise Exception('unknown label')
-
-                # only issues that are really closed and fixed:
-                issues = []
-                for issue_id in fixed_issue_ids:
-                    try:
-                        issue = Issue.objects.get(id=issue_id)
-                    except Issue.DoesNotExist:
-                        continue
+            issues.append(issue)
 
-                    # issueonly_bugfix considers linked_issue_ids, those may contain non-bugs
-                    if label in ['issueonly_bugfix', 'adjustedszz_bugfix', 'issuefasttext_bugfix'] and str(issue.issue_type).lower() != 'bug':
-                        continue
+        if not issues:
+            self._log.warn('skipping commit {} as none of its issue_ids {} are closed/fixed/resolved'.format(bugfix_commit.revision_hash, fixed_issue_ids))
+        return issues
 
-                    if not jira_is_resolved_and_fixed(issue):
-                        continue
+    def _mine_commit(self, bugfix_commit_id, configurations):
+        """Find bug inducing changes of one bug-fixing commit for all configurations.
 
-                    if label == 'validated_bugfix':
-                        if not issue.issue_type_verified or issue.issue_type_verified.lower() != 'bug':
-                            continue
+        :rtype: dict
+        :returns: changes of this commit for each configuration name
+        """
+        changes = {c['name']: OrderedDict() for c in configurations}
 
-                    issues.append(issue)
+        bugfix_commit = self._bugfix_commit(bugfix_commit_id)
 
+        # only modified files
+        for fa_id, _, path in self._file_actions.load(bugfix_commit.id, mode='M'):
+            ignore_lines = None
+            validated_bugfix_lines = None
+
+            for configuration in configurations:
+                label = configuration['label']
+
+                # only java files
+                if configuration['java_only'] and not java_filename_filter(path.lower()):
+                    continue
+
+                issues = self._issues(bugfix_commit, label)
                 if not issues:
-                    self._log.warn('skipping commit {} as none of its issue_ids {} are closed/fixed/resolved'.format(bugfix_commit.revision_hash, fixed_issue_ids))
                     continue
 
-                suspect_boundary_date = self._find_boundary_date(issues, self._version_dates, affected_versions)
+                # everything else only depends on the commit and a part of the configuration, we compute it only once for all configurations
+                suspect_boundary_date = self._find_boundary_date(issues, self._version_dates, configuration['affected_versions'])
 
                 # if ignore refactorings
-                ignore_lines = False
-                if ignore_refactorings:
+                file_ignore_lines = False
+                if configuration['ignore_refactorings']:
                     # get lines where refactorings happened
                     # pass them to the blame call
-                    ignore_lines = self.refactoring_lines(bugfix_commit.id, fa.id)
+                    if ignore_lines is None:
+                        ignore_lines = self.refactoring_lines(bugfix_commit.id, fa_id)
+                    file_ignore_lines = ignore_lines
 
-                validated_bugfix_lines = False
-                if only_validated_bugfix_lines:
-                    validated_bugfix_lines = self.bug_fixing_lines(fa.id)
+                file_validated_bugfix_lines = False
+                if configuration['only_validated_bugfix_lines']:
+                    if validated_bugfix_lines is None:
+                        validated_bugfix_lines = self.bug_fixing_lines(fa_id)
+                    file_validated_bugfix_lines = validated_bugfix_lines
 
                 # find bug inducing commits, add to our list for this commit and file
-                for blame_commit, original_file in self._cg.blame(bugfix_commit.revision_hash, f.path, inducing_strategy, ignore_lines, validated_bugfix_lines):
-                    blame_c = Commit.objects.only('id', 'committer_date', 'labels').get(vcs_system_id=self._vcs_id, revision_hash=blame_commit)
+                for blame_commit, original_file in self._cg.blame(bugfix_commit.revision_hash, path, configuration['inducing_strategy'], file_ignore_lines, file_validated_bugfix_lines):
+                    blame_c = self._commits.get(blame_commit)
 
                     # every commit before our suspect boundary date is counted towards inducing
                     if blame_c.committer_date < suspect_boundary_date:
@@ -341,67 +787,130 @@ class InducingMiner:
                             szz_type = 'partial_fix'
 
                     self._log.debug('blame commit date {} against boundary date {}, szz_type {}'.format(blame_c.committer_date, suspect_boundary_date, szz_type))
-                    for blame_fa in FileAction.objects.filter(commit_id=blame_c.id).timeout(False):
-                        blame_f = File.objects.get(id=blame_fa.file_id)
-
-                        if blame_f.path == original_file:
-                            key = str(fa.id) + '_' + str(blame_fa.id)
+                    for blame_fa_id in self._file_actions.get(blame_c.id, original_file):
+                        key = str(fa_id) + '_' + str(blame_fa_id)
 
-                            if key not in all_changes.keys():
-                                all_changes[key] = {'change_file_action_id': fa.id, 'inducing_file_action': blame_fa.id, 'label': label, 'szz_type': szz_type, 'inducing_strategy': inducing_strategy}
+                        if key not in changes[configuration['name']].keys():
+                            changes[configuration['name']][key] = {'change_file_action_id': fa_id, 'inducing_file_action': blame_fa_id, 'label': label, 'szz_type': szz_type, 'inducing_strategy': configuration['inducing_strategy']}
+        return changes
 
-        self._log.info('size of all changes: %s mb', asizeof.asizeof(all_changes) / 1024 / 1024)
+    def _write_changes(self, all_changes, name, write_batch_size=1000):
+        """Distinguish between hard and weak suspects and write the changes of one configuration."""
 
         # second run differenciate between hard and weak suspects
-        new_types = {}
         self._log.debug('starting second pass for distinguish hard and weak suspects')
-        for change, values in all_changes.items():
+        new_types = classify_suspects(all_changes)
 
-            # every suspect starts as hard_suspect
-            szz_type = 'hard_suspect'
-            if values['szz_type'] == 'suspect':
+        # write results
+        self._log.debug('writing results')
+        with InducingWriter(FileAction._get_collection(), batch_size=write_batch_size) as writer:
+            for change, values in all_changes.items():
+                szz_type = values['szz_type']
+                if szz_type == 'suspect':
+                    szz_type = new_types[change]
+
+                to_write = {'change_file_action_id': values['change_file_action_id'],
+                            'szz_type': szz_type,
+                            # these values are defined by the name
+                            # 'label': values['label'],
+                            # 'inducing_strategy': inducing_strategy,
+                            # 'java_only': java_only,
+                            # 'affected_versions': affected_versions,
+                            'label': name}
+
+                self._log.debug(to_write)
+                writer.add(values['inducing_file_action'], to_write)
+        self._log.info('wrote %s induces entries with %s updates for %s', writer.entries, writer.updates, name)
+
+    def _update_changes(self, changes, name, removed_commit_ids, labeled_commit_ids, unlabeled_commit_ids, write_batch_size=1000, batch_size=10000):
+        """Add the changes of new bug-fixing commits of one configuration to the existing induces entries.
+
+        Only the inducing FileActions of the new changes, the ones with changes of removed bug-fixing commits and the ones
+        of commits whose label changed are touched. Their existing entries are read, suspects of newly labeled commits become
+        partial fixes and vice versa. The entries are combined with the new changes and classified again, the entries with the name
+        of the configuration are then replaced.
+
+        :param dict changes: changes of the new bug-fixing commits
+        :param set removed_commit_ids: previously processed commits which are no longer bug-fixing commits
+        :param set labeled_commit_ids: commits which got the label of the configuration since the previous run
+        :param set unlabeled_commit_ids: commits which lost the label of the configuration since the previous run
+        """
+        collection = FileAction._get_collection()
+        touched = set(values['inducing_file_action'] for values in changes.values())
+
+        removed = set()
+        if removed_commit_ids:
+            removed = self._file_action_ids(removed_commit_ids)
+
+            # only the FileActions of this VCS system, in batches of commits like _clear_inducing
+            commit_ids = self._vcs_commit_ids()
+            for i in range(0, len(commit_ids), batch_size):
+                query = {'commit_id': {'$in': commit_ids[i:i + batch_size]}, 'induces': {'$elemMatch': {'label': name, 'change_file_action_id': {'$in': list(removed)}}}}
+                for fa in collection.find(query, {'_id': 1}):
+                    touched.add(fa['_id'])
+            self._log.info('removing changes of %s commits which are no longer bug-fixing commits for %s', len(removed_commit_ids), name)
+
+        labeled = self._file_action_ids(labeled_commit_ids)
+        unlabeled = self._file_action_ids(unlabeled_commit_ids)
+        touched.update(labeled, unlabeled)
+
+        # existing changes of the touched FileActions, they are overwritten by new changes with the same key
+        all_changes = OrderedDict()
+        touched = list(touched)
+        for i in range(0, len(touched), batch_size):
+            for fa in collection.find({'_id': {'$in': touched[i:i + batch_size]}}, {'induces': 1}):
+                for entry in fa.get('induces', []):
+                    if entry['label'] != name or entry['change_file_action_id'] in removed:
+                        continue
+                    szz_type = unclassified_type(entry['szz_type'])
+                    if szz_type == 'suspect' and fa['_id'] in labeled:
+                        szz_type = 'partial_fix'
+                    elif szz_type == 'partial_fix' and fa['_id'] in unlabeled:
+                        szz_type = 'suspect'
 
-                # is there a fix for this change which is not a suspect (which means it has to be a partial-fix or inducing)
-                # we set this type to weak_suspect
-                for change2, values2 in all_changes.items():
+                    key = str(entry['change_file_action_id']) + '_' + str(fa['_id'])
+                    all_changes[key] = {'change_file_action_id': entry['change_file_action_id'], 'inducing_file_action': fa['_id'], 'szz_type': szz_type}
+        all_changes.update(changes)
 
-                    # skip equal
-                    if change == change2:
-                        continue
+        new_types = classify_suspects(all_changes)
 
-                    if values2['inducing_file_action'] == values['inducing_file_action'] and values2['szz_type'] != 'suspect':
-                        szz_type = 'weak_suspect'
-                        self._log.debug('found another inducing change for this inducing change which is not a suspect, we set szz_type to weak_suspect')
-                new_types[change] = szz_type
+        with InducingWriter(collection, batch_size=write_batch_size, replace_label=name) as writer:
+            for file_action_id in touched:
+                writer.touch(file_action_id)
 
-        # write results
-        self._log.debug('writing results')
-        for change, values in all_changes.items():
-            fa = FileAction.objects.get(id=values['inducing_file_action'])
-
-            szz_type = values['szz_type']
-            if szz_type == 'suspect':
-                szz_type = new_types[change]
-
-            to_write = {'change_file_action_id': values['change_file_action_id'],
-                        'szz_type': szz_type,
-                        # these values are defined by the name
-                        # 'label': values['label'],
-                        # 'inducing_strategy': inducing_strategy,
-                        # 'java_only': java_only,
-                        # 'affected_versions': affected_versions,
-                        'label': name}
-
-            self._log.debug(to_write)
-            # we clear everything with this label beforehand because we may re-run this plugin with a different label or strategy
-            # new_list = []
-            # for d in fa.induces:
-            #     if d['label'] != label or d['inducing_strategy'] != inducing_strategy or d['java_only'] != java_only:  # keep values not matching our stuff
-            #         new_list.append(d)
-
-            # fa.induces = new_list
-            # fa.induces = []  # this deletes everything, also previous runs with a different label
-
-            if to_write not in fa.induces:
-                fa.induces.append(to_write)
-            fa.save()
+            for change, values in all_changes.items():
+                szz_type = values['szz_type']
+                if szz_type == 'suspect':
+                    szz_type = new_types[change]
+                writer.add(values['inducing_file_action'], {'change_file_action_id': values['change_file_action_id'], 'szz_type': szz_type, 'label': name})
+        self._log.info('updated %s inducing FileActions with %s induces entries for %s', len(touched), writer.entries, name)
+
+    def _file_action_ids(self, commit_ids):
+        """Return the ids of all FileActions of the commits."""
+        if not commit_ids:
+            return set()
+        return set(fa['_id'] for fa in FileAction.objects.filter(commit_id__in=list(commit_ids)).only('id').as_pymongo())
+
+
+def shard_of(commit_id, shards):
+    """Return the shard of a bug-fixing commit, the same on every machine."""
+    return zlib.crc32(commit_id.binary) % shards
+
+
+# state of a worker process for InducingMiner.mine_bug_inducing
+_worker_miner = None
+_worker_configurations = None
+
+
+def _init_worker(logger_name, connection, project_name, vcs_url, repo_path, cache_dir, configurations, bugfix_commit_ids):
+    """Initialize a worker process with its own database connection and CollectGit."""
+    global _worker_miner, _worker_configurations
+    _worker_miner = InducingMiner(logging.getLogger(logger_name), *connection, project_name, vcs_url, repo_path, cache_dir=cache_dir)
+    _worker_miner._prepare()
+    _worker_miner._prefetch_issues(bugfix_commit_ids)
+    _worker_configurations = configurations
+
+
+def _mine_commit_worker(item):
+    bugfix_commit_id, names = item
+    return _worker_miner._mine_commit(bugfix_commit_id, [c for c in _worker_configurations if c['name'] in names])
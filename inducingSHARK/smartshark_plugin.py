@@ -3,6 +3,7 @@
 """Plugin for execution with serverSHARK."""
 
 import sys
+import argparse
 import logging
 import timeit
 import tempfile
@@ -10,6 +11,8 @@ import tempfile
 from pympler import asizeof
 from pycoshark.utils import get_base_argparser
 from inducing import InducingMiner
+from util.checkpoint import Checkpoint
+from util.repository import RepositoryCache
 
 # set up logging, we log everything to stdout except for errors which go to stderr
 # this is then picked up by serverSHARK
@@ -25,27 +28,71 @@ log.addHandler(i)
 log.addHandler(e)
 
 
+# everything with label='validated_bugfix' uses commit.fixed_issue_ids
+# szz uses commit.szz_issue_ids
+CONFIGURATIONS = [
+    dict(label='adjustedszz_bugfix', inducing_strategy='all', java_only=False, affected_versions=False, ignore_refactorings=False, name='SZZ'),  # plain szz
+    dict(label='issueonly_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JL+R'),  # best automatic szz
+
+    dict(label='validated_bugfix', inducing_strategy='all', java_only=False, affected_versions=False, ignore_refactorings=False, name='JLMIV'),  # plain szz validated labels
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=False, name='JLMIV+'),  # improved szz validated labels
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=True, ignore_refactorings=False, name='JLMIV+AV'),  # improved szz validated labels, affected versions
+
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=True, ignore_refactorings=True, name='JLMIV+RAV'),  # best + AV
+
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JLMIV+R'),  # improved szz validated labels, without refactorings
+
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=False, name='JLMIVLV', only_validated_bugfix_lines=True),  # improved szz validated labels, only validated lines
+
+    dict(label='issuefasttext_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JLIP+R'),
+]
+
+
+def shard_argument(value):
+    """Parse a shard given as i/N into (i, N) with 0 <= i < N."""
+    try:
+        shard, shards = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('shard has to be given as i/N')
+    if not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError('shard has to be between 0 and N - 1')
+    return shard, shards
+
+
 def run_inducing(log, input_path, args):
-    im = InducingMiner(log, args.db_database, args.db_user, args.db_password, args.db_hostname, args.db_port, args.db_authentication, args.ssl, args.project_name, args.repository_url, input_path, repo_from_db=args.input is None)
-    im.collect()
+    repository_cache = None
+    if args.repository_cache_dir:
+        repository_cache = RepositoryCache(args.repository_cache_dir, args.repository_cache_size * 1024 * 1024 * 1024)
 
-    log.info("memory for git: %s mb", asizeof.asizeof(im._cg) / 1024 / 1024)
-    # everything with label='validated_bugfix' uses commit.fixed_issue_ids
-    # szz uses commit.szz_issue_ids
-    im.write_bug_inducing(label='adjustedszz_bugfix', inducing_strategy='all', java_only=False, affected_versions=False, ignore_refactorings=False, name='SZZ')  # plain szz
-    im.write_bug_inducing(label='issueonly_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JL+R')  # best automatic szz
+    im = InducingMiner(log, args.db_database, args.db_user, args.db_password, args.db_hostname, args.db_port, args.db_authentication, args.ssl, args.project_name, args.repository_url, input_path, repo_from_db=args.input is None and not args.merge, cache_dir=args.cache_dir, repository_cache=repository_cache)
+
+    # the shards contain all changes, the repository is not needed
+    if args.merge:
+        im.write_bug_inducing_shards(CONFIGURATIONS, args.merge)
+        return
 
-    im.write_bug_inducing(label='validated_bugfix', inducing_strategy='all', java_only=False, affected_versions=False, ignore_refactorings=False, name='JLMIV')  # plain szz validated labels
-    im.write_bug_inducing(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=False, name='JLMIV+')  # improved szz validated labels
-    im.write_bug_inducing(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=True, ignore_refactorings=False, name='JLMIV+AV')  # improved szz validated labels, affected versions
+    # shards do not write to the database, the merge clears the induces entries
+    im.collect(clear=not args.incremental and not args.shard)
 
-    im.write_bug_inducing(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=True, ignore_refactorings=True, name='JLMIV+RAV')  # best + AV
+    log.info("memory for git: %s mb", asizeof.asizeof(im._cg) / 1024 / 1024)
 
-    im.write_bug_inducing(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JLMIV+R')  # improved szz validated labels, without refactorings
+    # all configurations are mined in one pass over the bug-fixing commits
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = Checkpoint(args.checkpoint, args.checkpoint_interval)
+    if args.shard:
+        im.mine_shard(CONFIGURATIONS, args.shard[0], args.shard[1], checkpoint, processes=args.workers, resume=args.resume)
+    else:
+        im.write_bug_inducing_multi(CONFIGURATIONS, processes=args.workers, incremental=args.incremental, checkpoint=checkpoint, resume=args.resume)
 
-    im.write_bug_inducing(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=False, name='JLMIVLV', only_validated_bugfix_lines=True)  # improved szz validated labels, only validated lines
+    if repository_cache is not None:
+        repository_cache.close()
 
-    im.write_bug_inducing(label='issuefasttext_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JLIP+R')
+    # with worker processes the caches of the main process are not used for mining
+    if args.workers <= 1:
+        log.info("blame cache: %s", im._cg.blame_cache_stats())
+        log.info("hunk cache: %s", im._cg.hunk_cache_stats())
+        log.info("file action cache: %s", im._file_actions.stats())
 
 
 def main(args):
@@ -59,7 +106,9 @@ def main(args):
     input_path = args.input
 
     # If repo path is not set, we fetch the stored data from the database and put it into an temporary folder in the ram disc
-    if not args.input:
+    # unless it is kept in the repository cache
+    tmpdir = None
+    if not args.input and not args.repository_cache_dir and not args.merge:
         tmpdir = tempfile.TemporaryDirectory(dir='/dev/shm')
         input_path = tmpdir.name
         log.info('creating temporary directory %s', input_path)
@@ -67,7 +116,7 @@ def main(args):
     run_inducing(log, input_path, args)
 
     # also need to cleanup after
-    if not args.input:
+    if tmpdir is not None:
         tmpdir.cleanup()
 
     end = timeit.default_timer() - start
@@ -81,4 +130,23 @@ if __name__ == '__main__':
     parser.add_argument('-pn', '--project-name', help='Hash of the revision.', required=False)
     parser.add_argument('-u', '--repository-url', help='URL of the project (e.g., GIT Url).', required=False)
     parser.add_argument('-ll', '--log-level', help='Log level for stdout (DEBUG, INFO), default INFO', default='INFO')
-    main(parser.parse_args())
+    parser.add_argument('-w', '--workers', help='Number of worker processes for mining the bug-fixing commits, default 1', default=1, type=int)
+    parser.add_argument('-cd', '--cache-dir', help='Directory for keeping the commit graph and the hunks of commits between runs, default no cache', required=False)
+    parser.add_argument('-rcd', '--repository-cache-dir', help='Directory for keeping the repositories extracted from the MongoDB between runs, default no cache', required=False)
+    parser.add_argument('-rcs', '--repository-cache-size', help='Maximum size of the repository cache in GB, default 20', default=20, type=float)
+    parser.add_argument('--incremental', help='Only mine bug-fixing commits which were not processed by previous runs and keep the existing results', action='store_true')
+    parser.add_argument('-cp', '--checkpoint', help='File for checkpoints of the mined changes, default no checkpoints', required=False)
+    parser.add_argument('-cpi', '--checkpoint-interval', help='Seconds between checkpoints, default 600', default=600, type=int)
+    parser.add_argument('--resume', help='Continue from the checkpoint of a previous run which did not finish', action='store_true')
+    parser.add_argument('--shard', help='Only mine the shard i/N of the bug-fixing commits (0 <= i < N) and write the changes to the checkpoint file instead of the database', type=shard_argument, required=False)
+    parser.add_argument('--merge', help='Combine the checkpoint files of all shards and write the changes to the database', nargs='+', required=False)
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
+    if args.shard and not args.checkpoint:
+        parser.error('--shard requires --checkpoint')
+    if args.shard and (args.incremental or args.merge):
+        parser.error('--shard can not be combined with --incremental or --merge')
+    if args.merge and (args.incremental or args.resume or args.checkpoint):
+        parser.error('--merge can not be combined with --incremental, --resume or --checkpoint')
+    main(args)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a small size bounded LRU cache which is used to share intermediate results between configurations.
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Least recently used cache which is bounded by the summed size of its values.
+
+    The size of a value is determined by the sizeof function, by default every value has a size of 1 which makes
+    max_size the maximum number of entries.
+    """
+
+    def __init__(self, max_size, sizeof=None):
+        self._max_size = max_size
+        self._sizeof = sizeof if sizeof is not None else lambda value: 1
+        self._data = OrderedDict()
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used, counts hits and misses."""
+        try:
+            value, _ = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Add value for key, evicts least recently used values until the cache fits into max_size again.
+
+        Values which are larger than max_size on their own are not cached.
+        """
+        if key in self._data:
+            self.size -= self._data.pop(key)[1]
+
+        size = self._sizeof(value)
+        if size > self._max_size:
+            return
+
+        self._data[key] = (value, size)
+        self.size += size
+        while self.size > self._max_size:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self.size = 0
+
+    def stats(self):
+        """Return a dict with the hit/miss statistics and the current size of the cache."""
+        total = self.hits + self.misses
+        return {'entries': len(self._data),
+                'size': self.size,
+                'max_size': self._max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / total if total else 0.0}
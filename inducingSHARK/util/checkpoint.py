@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides checkpoints of the mined changes so that long runs can be resumed.
+"""
+
+import os
+import json
+import struct
+import timeit
+import zlib
+from collections import OrderedDict
+
+from bson import ObjectId
+
+
+class Checkpoint(object):
+    """Local file with the processed bug-fixing commits and the changes mined so far.
+
+    The file is written every interval seconds while mining. Every change is stored as the 12 bytes of its change FileAction id,
+    the 12 bytes of its inducing FileAction id and one byte for its szz_type, everything else is defined by the configuration.
+    The file contains a JSON header followed by the processed commit ids and the changes of every configuration as raw bytes.
+    Nothing is unpickled so that files which are copied between machines, e.g., of shards, can not execute code.
+    The file is written to a temporary file first which then replaces the checkpoint so that a crash while writing leaves
+    the previous checkpoint intact.
+    """
+
+    VERSION = 2
+    SZZ_TYPES = ['inducing', 'suspect', 'partial_fix']
+
+    def __init__(self, path, interval=600):
+        """
+        :param str path: checkpoint file
+        :param int interval: seconds between checkpoints
+        """
+        self._path = path
+        self._interval = interval
+        self._last = timeit.default_timer()
+
+    def due(self):
+        """Return True if the interval passed since the last checkpoint."""
+        return timeit.default_timer() - self._last >= self._interval
+
+    def save(self, key, configurations, processed, all_changes):
+        """Write a checkpoint.
+
+        :param key: identifies the run, e.g., the VCSSystem id, a checkpoint is only loaded for the same key
+        :param list configurations: configuration dicts of the run
+        :param list processed: ids of the processed bug-fixing commits
+        :param dict all_changes: changes for each configuration name
+        """
+        blobs = [b''.join(commit_id.binary for commit_id in processed)]
+        names = []
+        for name, config_changes in all_changes.items():
+            data = bytearray()
+            for values in config_changes.values():
+                data += values['change_file_action_id'].binary
+                data += values['inducing_file_action'].binary
+                data.append(self.SZZ_TYPES.index(values['szz_type']))
+            names.append(name)
+            blobs.append(bytes(data))
+
+        header = json.dumps({'version': self.VERSION,
+                             'key': key,
+                             'configurations': configurations,
+                             'names': names,
+                             'sizes': [len(blob) for blob in blobs]}).encode('utf-8')
+
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(struct.pack('>I', len(header)) + header + b''.join(blobs)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+        self._last = timeit.default_timer()
+
+    def load(self, key, configurations):
+        """Return the processed bug-fixing commits and the changes of the checkpoint.
+
+        :rtype: tuple
+        :returns: (processed, all_changes) or None if there is no checkpoint for key and configurations
+        """
+        try:
+            with open(self._path, 'rb') as f:
+                data = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+        header_size, = struct.unpack('>I', data[:4])
+        header = json.loads(data[4:4 + header_size].decode('utf-8'))
+        if header['version'] != self.VERSION or header['key'] != key or header['configurations'] != configurations:
+            return None
+
+        blobs = []
+        offset = 4 + header_size
+        for size in header['sizes']:
+            blobs.append(data[offset:offset + size])
+            offset += size
+
+        processed = [ObjectId(blobs[0][i:i + 12]) for i in range(0, len(blobs[0]), 12)]
+        changes = dict(zip(header['names'], blobs[1:]))
+
+        all_changes = {}
+        for configuration in configurations:
+            all_changes[configuration['name']] = OrderedDict()
+            data = changes[configuration['name']]
+            for i in range(0, len(data), 25):
+                change_file_action_id = ObjectId(data[i:i + 12])
+                inducing_file_action = ObjectId(data[i + 12:i + 24])
+                all_changes[configuration['name']][str(change_file_action_id) + '_' + str(inducing_file_action)] = {
+                    'change_file_action_id': change_file_action_id,
+                    'inducing_file_action': inducing_file_action,
+                    'label': configuration['label'],
+                    'szz_type': self.SZZ_TYPES[data[i + 24]],
+                    'inducing_strategy': configuration['inducing_strategy']}
+        return processed, all_changes
+
+    def remove(self):
+        """Remove the checkpoint after the run is complete."""
+        try:
+            os.remove(self._path)
+        except FileNotFoundError:
+            pass
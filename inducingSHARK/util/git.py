@@ -7,12 +7,19 @@ This module provides a wrapper around the basic pygit2 functionality for collect
 
 import os
 import re
+import sys
 import logging
 import subprocess
 from datetime import datetime, timezone
 
-import networkx as nx
-from pygit2 import Repository, GIT_DIFF_FIND_RENAMES, GIT_DIFF_FIND_COPIES, GIT_DIFF_FIND_RENAMES_FROM_REWRITES, GIT_OBJ_TAG, GIT_BLAME_TRACK_COPIES_SAME_FILE
+from pygit2 import Repository, Commit, GitError, Oid, GIT_DIFF_FIND_RENAMES, GIT_DIFF_FIND_COPIES, GIT_DIFF_FIND_RENAMES_FROM_REWRITES, GIT_BLAME_TRACK_COPIES_SAME_FILE
+
+from .cache import LRUCache
+from .graph import CommitGraph
+from .hunk import Hunk
+from .java import comment_only_change
+from .lines import LineIntervals
+from .store import GitStore
 
 
 class CollectGit(object):
@@ -21,10 +28,10 @@ class CollectGit(object):
     This does not scale because we hold a lot of data in memory.
     """
 
-    _regex_comment = re.compile(r"(//[^\"\n\r]*(?:\"[^\"\n\r]*\"[^\"\n\r]*)*[\r\n]|/\*([^*]|\*(?!/))*?\*/)(?=[^\"]*(?:\"[^\"]*\"[^\"]*)*$)")
-    _regex_jdoc_line = re.compile(r"(- |\+)\s*(\*|/\*).*")
+    # increase if the hunks computed by _get_hunks change, invalidates the hunks in the cache directory
+    _HUNKS_VERSION = 1
 
-    def __init__(self, path):
+    def __init__(self, path, blame_cache_size=256 * 1024 * 1024, hunk_cache_size=512 * 1024 * 1024, cache_dir=None):
         if not path.endswith('.git'):
             if not path.endswith('/'):
                 path += '/'
@@ -41,10 +48,44 @@ class CollectGit(object):
         self._cdays = {}
         self._branches = {}
         self._tags = {}
+        self._peeled = {}
 
         self._dopts = GIT_DIFF_FIND_RENAMES | GIT_DIFF_FIND_COPIES
         self._SIMILARITY_THRESHOLD = 50
-        self._graph = nx.DiGraph()
+        self._graph = CommitGraph()
+
+        # hunks per commit, shared by all files and configurations
+        self._hunk_cache = LRUCache(hunk_cache_size, sizeof=self._hunks_size)
+
+        # blamed lines per file, shared between strategies and configurations
+        self._blame_cache = LRUCache(blame_cache_size, sizeof=self._blame_size)
+
+        # commit graph and hunks between runs
+        self._store = GitStore(cache_dir) if cache_dir else None
+
+    @staticmethod
+    def _blame_size(blamed):
+        """Approximate memory size of a raw blame result in bytes."""
+        size = sys.getsizeof(blamed)
+        for inducing_commit, orig_path in blamed.values():
+            size += 100 + sys.getsizeof(inducing_commit) + sys.getsizeof(orig_path)
+        return size
+
+    @staticmethod
+    def _hunks_size(hunks):
+        """Approximate memory size of the hunks of a commit in bytes."""
+        return sys.getsizeof(hunks) + sum(h.size() for h in hunks)
+
+    def blame_cache_stats(self):
+        """Return hit/miss statistics of the blame cache."""
+        return self._blame_cache.stats()
+
+    def hunk_cache_stats(self):
+        """Return hit/miss statistics and the resident size in bytes of the hunk cache."""
+        stats = self._hunk_cache.stats()
+        if self._store is not None:
+            stats['stored'] = self._store.stats()
+        return stats
 
     @classmethod
     def clone_repo(cls, uri, local_path):
@@ -64,107 +105,135 @@ class CollectGit(object):
                 raise Exception(err)
         return repo_path
 
-    def _changed_lines(self, hunk):
-        added_lines = []
-        deleted_lines = []
-
-        del_line = hunk['old_start']
-        add_line = hunk['new_start']
-
-        for line in hunk['content'].split('\n'):
-
-            tmp = line[1:].strip()
-            # is_comment = tmp.startswith('//') or tmp.startswith('/*') or tmp.startswith('*')
-
-            if line.startswith('+'):
-                added_lines.append((add_line, tmp))
-                del_line -= 1
-            if line.startswith('-'):
-                deleted_lines.append((del_line, tmp))
-                add_line -= 1
-
-            del_line += 1
-            add_line += 1
-
-        return added_lines, deleted_lines
-
-    def _comment_only_change(self, content):
-        content = content + '\n'  # required for regex to drop comments
-        content = re.sub(self._regex_comment, "", content)
-        removed = ''
-        added = ''
-        for line in content.split('\n'):
-            line = re.sub(r"\s+", " ", line, flags=re.UNICODE)  # replace all kinds of whitespaces (also multiple) with sińgle whitespace
-            if not re.match(self._regex_jdoc_line, line):
-                if line.startswith('-'):
-                    removed += line[1:].strip()
-                elif line.startswith('+'):
-                    added += line[1:].strip()
-        return removed == added
-
-    def _blame_lines(self, revision_hash, filepath, strategy, ignore_lines=False, validated_bugfix_lines=False):
+    def _candidate_lines(self, revision_hash, filepath, strategy):
         """We want to find changed lines for one file in one commit (from the previous commit).
 
         For this we are iterating over the diff and counting the lines that are deleted (changed) from the original file.
         We ignore all added lines.
 
-        ignore_lines is already specific to all changed hunks of the file for which blame_lines is called
+        These are the lines before applying the ignore_lines and validated_bugfix_lines filters, they only depend on the strategy.
         """
-        c = self._repo.revparse_single('{}'.format(revision_hash))
-        self._hunks[revision_hash] = self._get_hunks(c)
-
         changed_lines = []
-        if revision_hash not in self._hunks.keys() or not self._hunks[revision_hash]:
-            return changed_lines
-
-        for h in self._hunks[revision_hash]:
-            if h['new_file'] != filepath:
+        seen = set()
+        for h in self._commit_hunks(revision_hash):
+            if h.new_file != filepath:
                 continue
 
             # only whitespace or comment changes in the hunk, ignore
-            if strategy == 'code_only' and self._comment_only_change(h['content']):
+            if strategy == 'code_only' and h.comment_only:
                 self._log.debug('detected whitepace or comment only change in {} for {}'.format(revision_hash, filepath))
                 continue
 
-            added, deleted = self._changed_lines(h)
-            for dt in deleted:
-                if dt not in changed_lines and dt[1]:
+            for dt in h.deleted:
+                if dt not in seen and dt[1]:
                     if strategy == 'code_only' and dt[1].startswith(('//', '/*', '*')):
                         continue
 
-                    # we may only want validated lines
-                    if validated_bugfix_lines is not False:
-                        if dt[0] not in validated_bugfix_lines:
-                            continue
+                    seen.add(dt)
+                    changed_lines.append(dt)
 
-                    # we may ignore lines, e.g., refactorings
-                    if ignore_lines:
-                        ignore = False
-                        for start_line, end_line in ignore_lines:
-                            if start_line <= dt[0] <= end_line:
-                                ignore = True
-                                break
+        return changed_lines
 
-                        # if we hit the line in our ignore list we continue to the next
-                        if ignore:
-                            # self._log.warn('ignore line {} in file {} in commit {} because of refactoring detection'.format(dt[0], filepath, revision_hash))
-                            continue
+    def _commit_hunks(self, revision_hash):
+        """Return the hunks of the commit, the diff is computed once and kept in the hunk cache."""
+        hunks = self._hunk_cache.get(revision_hash)
+        if hunks is None:
+            commit = self._repo.revparse_single('{}'.format(revision_hash))
+            if self._store is not None:
+                key = '{} {} {} {} {}'.format(commit.hex, ','.join(str(p) for p in commit.parent_ids), self._dopts, self._SIMILARITY_THRESHOLD, self._HUNKS_VERSION)
+                hunks = self._store.get_hunks(key)
+
+            if hunks is None:
+                hunks = self._get_hunks(commit)
+                if self._store is not None:
+                    self._store.put_hunks(key, hunks)
+            self._hunk_cache.put(revision_hash, hunks)
+        return hunks
 
-                    changed_lines.append(dt)
+    def _filter_lines(self, lines, ignore_lines=False, validated_bugfix_lines=False):
+        """Filter (lineno, line) tuples or tuples starting with lineno by the validated bugfix lines and the ignored lines."""
+        # we may only want validated lines
+        if validated_bugfix_lines is not False:
+            validated_bugfix_lines = set(validated_bugfix_lines)
 
-        return changed_lines
+        # we may ignore lines, e.g., refactorings
+        if ignore_lines:
+            ignore_lines = LineIntervals(ignore_lines)
+
+        filtered = []
+        for dt in lines:
+            if validated_bugfix_lines is not False and dt[0] not in validated_bugfix_lines:
+                continue
+
+            # if we hit the line in our ignore list we continue to the next
+            if ignore_lines and dt[0] in ignore_lines:
+                # self._log.warn('ignore line {} in file {} in commit {} because of refactoring detection'.format(dt[0], filepath, revision_hash))
+                continue
+
+            filtered.append(dt)
+        return filtered
+
+    def _blame_lines(self, revision_hash, filepath, strategy, ignore_lines=False, validated_bugfix_lines=False):
+        """We want to find changed lines for one file in one commit (from the previous commit).
+
+        ignore_lines is already specific to all changed hunks of the file for which blame_lines is called
+        """
+        return self._filter_lines(self._candidate_lines(revision_hash, filepath, strategy), ignore_lines, validated_bugfix_lines)
+
+    def _blame_raw(self, revision_hash, filepath, linenos):
+        """Blame the given lines of the file in the parent of revision_hash.
+
+        The blame is restricted to the span between the first and the last line which is not already known.
+        The results are cached by (revision_hash, filepath) and shared by all strategies and configurations, every call
+        only has to blame the lines which are missing from the cache.
+
+        :rtype: dict
+        :returns: A dict of lineno -> (blame commit, original file) which contains at least the given lines.
+        """
+        key = (revision_hash, filepath)
+        blamed = self._blame_cache.get(key)
+        if blamed is None:
+            blamed = {}
+
+        missing = [lineno for lineno in linenos if lineno not in blamed]
+        if missing:
+            parent_commit = self._repo.revparse_single('{}^'.format(revision_hash))
+
+            blame = self._repo.blame(filepath, flags=GIT_BLAME_TRACK_COPIES_SAME_FILE, newest_commit=parent_commit.hex, min_line=min(missing), max_line=max(missing))
+
+            # consecutive lines often belong to the same blame hunk, it is only resolved once
+            hunk_start = hunk_end = 0
+            for lineno in sorted(missing):
+                if not hunk_start <= lineno < hunk_end:
+                    # returns blamehunk for specific line
+                    try:
+                        bh = blame.for_line(lineno)
+                    except IndexError as e:
+                        # this happens when we have the wrong parent node
+                        bla = 'tried to get file: {}, line: {}, revision: {}'.format(filepath, lineno, revision_hash)
+                        self._log.error(bla)
+                        raise  # this is critical
+
+                    hunk_start = bh.final_start_line_number
+                    hunk_end = hunk_start + bh.lines_in_hunk
+                    inducing = (str(bh.orig_commit_id), bh.orig_path)
+
+                blamed[lineno] = inducing
+
+            self._blame_cache.put(key, blamed)
+        return blamed
 
     def blame(self, revision_hash, filepath, strategy='code_only', ignore_lines=False, validated_bugfix_lines=False):
         """Collect a list of commits where the given revision and file were last changed.
 
-        Uses git blame.
+        Uses git blame, only the lines which remain after filtering are blamed.
 
         :param str revision_hash: Commit for which we want to collect blame commits.
         :param str filepath: File for which we want to collect blame commits.
         :rtype: list
         :returns: A list of tuples of blame commits and the original file for the given parameters.
         """
-        commits = []
+        commits = set()
 
         # - ignore if commit is not in graph
         if revision_hash not in self._graph:
@@ -181,47 +250,21 @@ class CollectGit(object):
         #     return []
 
         # bail on multiple parents
-        parents = list(self._graph.predecessors(revision_hash))
+        parents = self._graph.parents(revision_hash)
         if len(parents) > 1:
             self._log.debug('skipping blame on revision: {} because it is a merge commit'.format(revision_hash))
             return []
 
+        # nothing left to blame after filtering
         changed_lines = self._blame_lines(revision_hash, filepath, strategy, ignore_lines, validated_bugfix_lines)
-        parent_commit = self._repo.revparse_single('{}^'.format(revision_hash))
+        if not changed_lines:
+            return []
 
-        blame = self._repo.blame(filepath, flags=GIT_BLAME_TRACK_COPIES_SAME_FILE, newest_commit=parent_commit.hex)
+        blamed = self._blame_raw(revision_hash, filepath, [lineno for lineno, line in changed_lines])
         for lineno, line in changed_lines:
-            # returns blamehunk for specific line
-            try:
-                bh = blame.for_line(lineno)
-            except IndexError as e:
-                # this happens when we have the wrong parent node
-                bla = 'tried to get file: {}, line: {}, revision: {}, blame commit: {}'.format(filepath, lineno, revision_hash, str(bh.orig_commit_id))
-                self._log.error(bla)
-                raise  # this is critical
-
-            inducing_commit = self._repo.revparse_single(str(bh.orig_commit_id))
-
-            # start = bh.orig_start_line_number
-            # lines = bh.lines_in_hunk
-            # final_start = bh.final_start_line_number
-            # print(revision_hash, '->', inducing_commit.hex)
-            # print('original: {}: {}'.format(lineno, line))
-            # print('{},{}: {},{}'.format(start, lines, final_start, lines))
-
-            # blame_lines = []
-            # for hunk in self._hunks[inducing_commit.hex]:
-            #     if hunk['new_file'] != bh.orig_path:
-            #         continue
-            #     ls = final_start
-            #     for i, blame_line in enumerate(hunk['content'].split('\n')):
-            #         if blame_line[1:].strip() and line[1:].strip() and blame_line[1:] == line[1:]:
-            #             print('blame: {}:{}'.format(ls, blame_line))
-            #         ls += 1
-            commits.append((inducing_commit.hex, bh.orig_path))
-
-        # make unique
-        return list(set(commits))
+            commits.add(blamed[lineno])
+
+        return list(commits)
 
     def commit_information(self, revision_hash):
         obj = self._repo.get(revision_hash)
@@ -357,19 +400,15 @@ class CollectGit(object):
                 if initial:
                     mode = 'A'
 
-                # we may have hunks to add
-                if patch.hunks and commit.hex not in self._hunks.keys():
-                    self._hunks[commit.hex] = []
-
                 # add hunks
                 for hunk in patch.hunks:
                     # initial is special case
                     if initial:
                         content = ''.join(['+' + l.content for l in hunk.lines])
-                        hunks.append({'header': hunk.header, 'new_file': patch.delta.new_file.path, 'new_start': hunk.old_start, 'new_lines': hunk.old_lines, 'old_start': hunk.new_start, 'old_lines': hunk.new_lines, 'content': content})
+                        hunks.append(Hunk(patch.delta.new_file.path, hunk.old_start, hunk.old_lines, hunk.new_start, hunk.new_lines, content, comment_only_change(content)))
                     else:
                         content = ''.join([l.origin + l.content for l in hunk.lines])
-                        hunks.append({'header': hunk.header, 'new_file': patch.delta.new_file.path, 'new_start': hunk.new_start, 'new_lines': hunk.new_lines, 'old_start': hunk.old_start, 'old_lines': hunk.old_lines, 'content': content})
+                        hunks.append(Hunk(patch.delta.new_file.path, hunk.new_start, hunk.new_lines, hunk.old_start, hunk.old_lines, content, comment_only_change(content)))
         return hunks
 
 
@@ -457,64 +496,102 @@ class CollectGit(object):
         return changed_files
 
     def collect(self):
+        # the graph of a previous run only needs the new commits
+        if self._store is not None:
+            tips = self._tips()
+            graph, complete = self._store.load_graph(tips, lambda revision_hash: revision_hash in self._repo)
+            if graph is not None:
+                self._log.info('using stored commit graph with %s commits, complete: %s', len(graph), complete)
+                self._graph = graph
+            if complete:
+                return self._graph
+
         # list all branches
         for branch in list(self._repo.branches):
             self._collect_branch(branch)
 
-        # list all tags
-        for obj in self._repo:
-            tag = self._repo[obj]
-            if tag.type == GIT_OBJ_TAG:
-                self._collect_branch(tag, is_tag=True)
+        # list all tags, only the references are used instead of looking at every object of the repository
+        for name in self._repo.listall_references():
+            if name.startswith('refs/tags/'):
+                self._collect_branch(self._repo.lookup_reference(name), is_tag=True)
 
+        if self._store is not None:
+            self._store.save_graph(tips, self._graph)
         return self._graph
 
+    def _tips(self):
+        """Return the sorted revision hashes of the targets of all branches and tags."""
+        tips = set()
+        for name in self._repo.listall_references():
+            if name.startswith(('refs/heads/', 'refs/remotes/', 'refs/tags/')):
+                target = self._repo.lookup_reference(name).target
+                if isinstance(target, Oid):
+                    tips.add(str(target))
+        return sorted(tips)
+
+    def _peel(self, target):
+        """Return the id of the commit target points to, annotated tags are only peeled once.
+
+        :returns: The Oid of the commit or None if target does not point to a commit.
+        """
+        if target not in self._peeled:
+            try:
+                self._peeled[target] = self._repo[target].peel(Commit).id
+            except (KeyError, ValueError, GitError) as e:
+                # self._log.error('skipping {}, error: {}'.format(target, e))
+                self._peeled[target] = None
+        return self._peeled[target]
+
     def _collect_branch(self, branch, is_tag=False):
         if type(branch) == str:
             branch = self._repo.branches[branch]
 
-        # add nodes to graph
-        try:
-            for c in self._repo.walk(branch.target):
-                self._graph.add_node(c.hex)
-
-                # branch stuff, used for traversing backwards for tags in svn->git conversions
-                # if c.hex not in self._branches.keys():
-                #     self._branches[c.hex] = []
-
-                # what about tags which are also on branches?
-                # if is_tag:
-                #     self._tags[c.hex] = branch.name
-                # else:
-                #     self._branches[c.hex].append(branch.branch_name)
-
-                # add msg
-                # self._msgs[c.hex] = c.message
-
-                # add days, we use this later for lookup
-                # day = str(datetime.fromtimestamp(c.commit_time, tz=timezone.utc).date())
-                # if day not in self._days.keys():
-                #     self._days[day] = []
-                # self._days[day].append(c.hex)
-
-                # add for convenience for OntdekBaanBfs
-                # self._cdays[c.hex] = day
-
-                # add changed files per node
-                # if c.hex not in self._file_actions.keys():
-                #     self._file_actions[c.hex] = self._changed_files(c)
-
-                # still too expensive
-                # self._create_hunks(c)
-
-            # add edges to graph
-            for c in self._repo.walk(branch.target):
-                for p in c.parents:
-                    self._graph.add_edge(p.hex, c.hex)
-        except ValueError as e:
-            pass
-            # self._log.error('skipping {}, error: {}'.format(branch, e))
-            # self._log.exception(e)
-
-        # add commit msgs
-        # nx.set_node_attributes(self._graph, self._msgs, 'msg')
+        # most tags point to history which is already in the graph
+        commit_id = self._peel(branch.target)
+        if commit_id is None or self._graph.walked(commit_id.raw):
+            return
+
+        # add all commits with their parents to the graph, history which is already in the graph
+        # because it is reachable from another branch or tag is not walked again
+        stack = [commit_id]
+        while stack:
+            oid = stack.pop()
+            if self._graph.walked(oid.raw):
+                continue
+
+            try:
+                c = self._repo[oid]
+            except KeyError:
+                continue  # missing parent, e.g., in shallow clones
+
+            self._graph.add(oid.raw, [p.raw for p in c.parent_ids])
+            stack.extend(c.parent_ids)
+
+            # branch stuff, used for traversing backwards for tags in svn->git conversions
+            # if c.hex not in self._branches.keys():
+            #     self._branches[c.hex] = []
+
+            # what about tags which are also on branches?
+            # if is_tag:
+            #     self._tags[c.hex] = branch.name
+            # else:
+            #     self._branches[c.hex].append(branch.branch_name)
+
+            # add msg
+            # self._msgs[c.hex] = c.message
+
+            # add days, we use this later for lookup
+            # day = str(datetime.fromtimestamp(c.commit_time, tz=timezone.utc).date())
+            # if day not in self._days.keys():
+            #     self._days[day] = []
+            # self._days[day].append(c.hex)
+
+            # add for convenience for OntdekBaanBfs
+            # self._cdays[c.hex] = day
+
+            # add changed files per node
+            # if c.hex not in self._file_actions.keys():
+            #     self._file_actions[c.hex] = self._changed_files(c)
+
+            # still too expensive
+            # self._create_hunks(c)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a compact commit graph which replaces the networkx graph of CollectGit.
+"""
+
+from array import array
+
+
+_OID_SIZE = 20
+
+
+class CommitGraph(object):
+    """Parents of all commits of a repository.
+
+    Commits are identified by their binary object id which points to a position. The object ids are stored as 20 bytes
+    per position, the parents of all commits as positions in one flat array with the first index and the number of
+    parents per position in two additional arrays.
+    Instead of a dict we use an open addressing hash table of positions, the object ids are already uniformly distributed
+    so the first bytes are used as hash. This keeps the graph at about 50 bytes per commit.
+    Commits which are only known as parent of another commit are contained in the graph but have no parents.
+
+    Lookups use hex revision hashes like the rest of CollectGit.
+    """
+
+    def __init__(self):
+        self._table = array('q', [-1]) * 1024
+        self._oids = bytearray()
+        self._starts = array('q')
+        self._counts = array('H')
+        self._parents = array('I')
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __contains__(self, revision_hash):
+        try:
+            oid = bytes.fromhex(revision_hash)
+        except (TypeError, ValueError):
+            return False
+        return self._table[self._slot(oid)] != -1
+
+    def _slot(self, oid):
+        """Return the slot of the hash table which holds the position of oid or the empty slot where it belongs."""
+        mask = len(self._table) - 1
+        slot = int.from_bytes(oid[:8], 'little') & mask
+        while True:
+            position = self._table[slot]
+            if position == -1 or self._oids[position * _OID_SIZE:(position + 1) * _OID_SIZE] == oid:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        self._table = array('q', [-1]) * (len(self._table) * 2)
+        for position in range(len(self._starts)):
+            self._table[self._slot(bytes(self._oids[position * _OID_SIZE:(position + 1) * _OID_SIZE]))] = position
+
+    def _position(self, oid):
+        slot = self._slot(oid)
+        position = self._table[slot]
+        if position == -1:
+            position = len(self._starts)
+            self._table[slot] = position
+            self._oids += oid
+            self._starts.append(-1)
+            self._counts.append(0)
+            if len(self._starts) * 2 > len(self._table):
+                self._grow()
+        return position
+
+    def add(self, oid, parent_oids):
+        """Add a commit with its parents, commits which were already added are ignored.
+
+        :param bytes oid: binary object id of the commit
+        :param list parent_oids: binary object ids of the parents
+        """
+        position = self._position(oid)
+        if self._starts[position] != -1:
+            return
+
+        parents = [self._position(parent_oid) for parent_oid in parent_oids]
+        self._starts[position] = len(self._parents)
+        self._counts[position] = len(parents)
+        self._parents.extend(parents)
+
+    def walked(self, oid):
+        """Return True if the commit was added with its parents, i.e., its history is already part of the graph."""
+        position = self._table[self._slot(oid)]
+        return position != -1 and self._starts[position] != -1
+
+    def parents(self, revision_hash):
+        """Return the revision hashes of the parents of a commit.
+
+        :rtype: list
+        """
+        position = self._table[self._slot(bytes.fromhex(revision_hash))]
+        if position == -1:
+            raise KeyError(revision_hash)
+
+        start = self._starts[position]
+        if start == -1:
+            return []
+
+        parents = []
+        for parent in self._parents[start:start + self._counts[position]]:
+            parents.append(self._oids[parent * _OID_SIZE:(parent + 1) * _OID_SIZE].hex())
+        return parents
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a compact representation of diff hunks for blaming deleted lines.
+"""
+
+import sys
+from array import array
+
+
+class Hunk(object):
+    """One hunk of a diff which only keeps what is needed for blame.
+
+    Instead of the header and content we store the line numbers and the stripped text of the deleted lines
+    and whether the hunk only changes whitespace or comments. File paths are interned.
+    """
+
+    __slots__ = ('new_file', 'new_start', 'new_lines', 'old_start', 'old_lines', 'comment_only', '_deleted', '_deleted_text')
+
+    def __init__(self, new_file, new_start, new_lines, old_start, old_lines, content, comment_only=False):
+        self.new_file = sys.intern(new_file)
+        self.new_start = new_start
+        self.new_lines = new_lines
+        self.old_start = old_start
+        self.old_lines = old_lines
+        self.comment_only = comment_only
+
+        deleted = array('l')
+        deleted_text = []
+        end = 0
+
+        # added lines do not count towards the line numbers of the old file
+        del_line = old_start
+        for line in content.split('\n'):
+            if line.startswith('+'):
+                continue
+            if line.startswith('-'):
+                text = line[1:].strip()
+                end += len(text)
+                deleted.append(del_line)
+                deleted.append(end)
+                deleted_text.append(text)
+            del_line += 1
+
+        # line numbers and end offsets of the deleted lines alternate in one array,
+        # the stripped text of all deleted lines is kept in one string and sliced by the end offsets
+        self._deleted = deleted
+        self._deleted_text = ''.join(deleted_text)
+
+    @property
+    def deleted(self):
+        """Deleted lines as (line number in the old file, stripped text) tuples."""
+        start = 0
+        for i in range(0, len(self._deleted), 2):
+            end = self._deleted[i + 1]
+            yield self._deleted[i], self._deleted_text[start:end]
+            start = end
+
+    def size(self):
+        """Approximate memory size in bytes."""
+        return sys.getsizeof(self) + sys.getsizeof(self._deleted) + sys.getsizeof(self._deleted_text)
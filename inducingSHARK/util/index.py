@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides compact in-memory indexes for information from the MongoDB which is looked up repeatedly while mining.
+"""
+
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from .cache import LRUCache
+
+
+CommitInfo = namedtuple('CommitInfo', ['id', 'committer_date', 'labels'])
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NO_DATE = -2 ** 63
+
+
+class CommitIndex(object):
+    """Map revision hashes to commit id, committer_date and bug-fixing labels.
+
+    Instead of one document per commit the information is kept in flat arrays:
+    the binary revision hash points to a position, the ObjectId is stored as 12 bytes,
+    the committer_date as microseconds since the epoch and the labels as a bitmask of the given label names.
+    Only labels which are True are considered as set.
+
+    Hashes which are not in the index are passed to the fallback, which returns the same information as add expects
+    (or raises if the commit does not exist). The result of the fallback is added to the index.
+    """
+
+    def __init__(self, labels, fallback=None):
+        if len(labels) > 8:
+            raise Exception('only up to 8 labels are supported')
+        self._labels = list(labels)
+        self._fallback = fallback
+
+        self._positions = {}
+        self._ids = bytearray()
+        self._dates = array('q')
+        self._flags = array('B')
+
+        self.fallbacks = 0
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, revision_hash):
+        return bytes.fromhex(revision_hash) in self._positions
+
+    def add(self, revision_hash, commit_id, committer_date, labels):
+        """Add a commit to the index, labels is the labels dict of the commit."""
+        key = bytes.fromhex(revision_hash)
+        if key in self._positions:
+            return
+
+        flags = 0
+        for bit, label in enumerate(self._labels):
+            if labels and labels.get(label) is True:
+                flags |= 1 << bit
+
+        self._positions[key] = len(self._flags)
+        self._ids += commit_id.binary
+        self._dates.append(_NO_DATE if committer_date is None else (committer_date - _EPOCH) // _MICROSECOND)
+        self._flags.append(flags)
+
+    def get(self, revision_hash):
+        """Return CommitInfo for the revision hash, uses the fallback for unknown hashes.
+
+        :rtype: CommitInfo
+        """
+        position = self._positions.get(bytes.fromhex(revision_hash))
+        if position is None:
+            if self._fallback is None:
+                raise KeyError(revision_hash)
+            self.fallbacks += 1
+            self.add(revision_hash, *self._fallback(revision_hash))
+            position = self._positions[bytes.fromhex(revision_hash)]
+
+        commit_id = ObjectId(bytes(self._ids[position * 12:position * 12 + 12]))
+        date = self._dates[position]
+        committer_date = None if date == _NO_DATE else _EPOCH + date * _MICROSECOND
+        flags = self._flags[position]
+        labels = {label: True for bit, label in enumerate(self._labels) if flags & (1 << bit)}
+        return CommitInfo(commit_id, committer_date, labels)
+
+
+class FileActionIndex(object):
+    """Map (commit_id, path) to the FileActions of the commit which changed a file with this path.
+
+    The FileActions of a commit are loaded lazily with one aggregation which joins the paths of the Files.
+    The result is cached per commit, the cache is bounded by the number of cached FileActions.
+    """
+
+    def __init__(self, collection, file_collection_name, max_file_actions=1000000):
+        """
+        :param collection: pymongo collection of the FileActions
+        :param str file_collection_name: name of the File collection used for the join
+        :param int max_file_actions: maximum number of FileActions in the cache
+        """
+        self._collection = collection
+        self._file_collection_name = file_collection_name
+        self._cache = LRUCache(max_file_actions, sizeof=lambda paths: max(1, sum(len(ids) for ids in paths.values())))
+
+    def load(self, commit_id, mode=None):
+        """Load all FileActions of a commit, bypasses the cache.
+
+        :param mode: restrict to FileActions with this mode, e.g., M
+        :rtype: list
+        :returns: A list of tuples (file_action_id, mode, path)
+        """
+        match = {'commit_id': commit_id}
+        if mode is not None:
+            match['mode'] = mode
+
+        pipeline = [
+            {'$match': match},
+            {'$lookup': {'from': self._file_collection_name, 'localField': 'file_id', 'foreignField': '_id', 'as': 'file'}},
+            {'$project': {'mode': 1, 'file.path': 1}},
+        ]
+        file_actions = []
+        for fa in self._collection.aggregate(pipeline):
+            for f in fa['file']:
+                file_actions.append((fa['_id'], fa.get('mode'), f['path']))
+        return file_actions
+
+    def get(self, commit_id, path):
+        """Return the ids of all FileActions of the commit for the path.
+
+        :rtype: list
+        """
+        paths = self._cache.get(commit_id)
+        if paths is None:
+            paths = {}
+            for file_action_id, mode, fa_path in self.load(commit_id):
+                if fa_path not in paths.keys():
+                    paths[fa_path] = []
+                paths[fa_path].append(file_action_id)
+            self._cache.put(commit_id, paths)
+        return paths.get(path, [])
+
+    def stats(self):
+        """Return hit/miss statistics of the cache."""
+        return self._cache.stats()
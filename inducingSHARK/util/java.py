@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a linear time comment stripper for Java like sources which is used to detect comment only changes in hunks.
+"""
+
+import re
+
+
+# start of everything that changes the state of the scanner
+_TOKEN = re.compile(r'//|/\*|"|\'')
+
+# line comments include the first line break, strings and char literals never span lines
+_LINE_COMMENT = re.compile(r'//[^\r\n]*[\r\n]?')
+_STRING = re.compile(r'"[^"\\\r\n]*(?:\\[^\r\n][^"\\\r\n]*)*"?')
+_CHAR = re.compile(r"'(?:[^'\\\r\n]|\\(?:u+[0-9a-fA-F]{4}|[0-7]{1,3}|[^\r\n]))'")
+
+
+def strip_comments(source):
+    """Remove line and block comments from source in one pass.
+
+    Line comments are removed together with the following line break, this keeps the behaviour of the regular expression
+    which was used before, i.e., changing a comment at the end of a line with code is not a comment only change.
+    Block comments which are not closed and single quotes which do not form a char literal (e.g., apostrophes in
+    comments whose start is not part of the hunk) are kept as code.
+
+    :param str source: source code, e.g., the content of a hunk
+    :rtype: str
+    """
+    parts = []
+    copy_from = 0
+    pos = 0
+    block_end = None  # position of the next */, cached because unclosed block comments would rescan the rest of the source
+    while True:
+        m = _TOKEN.search(source, pos)
+        if m is None:
+            break
+
+        start = m.start()
+        token = m.group()
+        if token == '"':
+            pos = _STRING.match(source, start).end()
+        elif token == "'":
+            char = _CHAR.match(source, start)
+            pos = char.end() if char is not None else start + 1
+        elif token == '//':
+            parts.append(source[copy_from:start])
+            pos = copy_from = _LINE_COMMENT.match(source, start).end()
+        else:
+            if block_end is None or block_end != -1 and block_end < start + 2:
+                block_end = source.find('*/', start + 2)
+            if block_end == -1:
+                pos = start + 2
+            else:
+                parts.append(source[copy_from:start])
+                pos = copy_from = block_end + 2
+
+    parts.append(source[copy_from:])
+    return ''.join(parts)
+
+
+def comment_only_change(content):
+    """Return True if the hunk content only changes comments or whitespace.
+
+    All comments are removed, javadoc lines (starting with * or /*) are ignored and the remaining removed and added lines
+    are compared without whitespace.
+
+    :param str content: hunk content where every line starts with its origin, i.e., +, - or a space
+    :rtype: bool
+    """
+    removed = []
+    added = []
+    for line in strip_comments(content).split('\n'):
+        origin = line[:1]
+        if origin != '-' and origin != '+':
+            continue
+
+        code = line[1:]
+        if code.lstrip().startswith(('*', '/*')) and (origin == '+' or code[:1].isspace()):
+            continue
+
+        if origin == '-':
+            removed.append(' '.join(code.split()))
+        else:
+            added.append(' '.join(code.split()))
+    return ''.join(removed) == ''.join(added)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides helpers for line number lookups.
+"""
+
+from bisect import bisect_right
+
+
+class LineIntervals(object):
+    """Sorted, merged and inclusive line intervals with bisect lookups.
+
+    A line is contained if start_line <= line <= end_line for any of the given intervals.
+    """
+
+    def __init__(self, intervals):
+        self._starts = []
+        self._ends = []
+        for start_line, end_line in sorted(intervals):
+            # empty interval, can never contain a line
+            if start_line > end_line:
+                continue
+
+            # overlapping or adjacent to the previous interval
+            if self._ends and start_line <= self._ends[-1] + 1:
+                self._ends[-1] = max(self._ends[-1], end_line)
+                continue
+
+            self._starts.append(start_line)
+            self._ends.append(end_line)
+
+    def __contains__(self, line):
+        i = bisect_right(self._starts, line) - 1
+        return i >= 0 and line <= self._ends[i]
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __bool__(self):
+        return bool(self._starts)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides the extraction of the repository archive which vcsSHARK stores in the GridFS and a cache of extracted repositories.
+"""
+
+import os
+import fcntl
+import json
+import shutil
+import logging
+import tarfile
+import tempfile
+import time
+
+
+def extract_archive(fileobj, target_path):
+    """Extract a tar.gz archive from a file like object without reading it completely or writing it to disk first.
+
+    The archive is read sequentially, e.g., directly from the chunks of a GridFS file.
+
+    :param fileobj: file like object with a read method
+    :param str target_path: directory to extract into
+    :rtype: set
+    :returns: names of the top-level entries of the archive
+    """
+    top_level = set()
+
+    def members(tar):
+        for member in tar:
+            parts = [part for part in member.name.split('/') if part not in ('', '.')]
+            if parts:
+                top_level.add(parts[0])
+            yield member
+
+    with tarfile.open(fileobj=fileobj, mode='r|gz') as tar:
+        tar.extractall(target_path, members=members(tar))
+    return top_level
+
+
+def repository_path(target_path, top_level):
+    """Return the path of the extracted repository from the top-level entries of the archive.
+
+    The archive either contains the repository directory or the repository itself, i.e., a .git directory at the top-level.
+
+    :returns: path of the repository ending with / or None if it can not be determined
+    """
+    if not target_path.endswith('/'):
+        target_path += '/'
+
+    if '.git' in top_level:
+        return target_path
+
+    directories = [name for name in top_level if os.path.isdir(os.path.join(target_path, name))]
+    if len(directories) == 1:
+        return '{}{}/'.format(target_path, directories[0])
+    return None
+
+
+class RepositoryCache(object):
+    """Directory of extracted repositories which are reused between runs.
+
+    Every repository is kept in its own directory named by a key, e.g., the GridFS file id and md5 of the archive.
+    A marker file is written after the extraction is complete, repositories without it are not used.
+    The extraction happens in a temporary directory which is renamed afterwards so that concurrent runs do not see
+    partial repositories. If the summed size of the repositories exceeds max_size the least recently used ones are removed.
+
+    Repositories which are returned by get or put are in use until release or close is called or the process ends.
+    This is marked with a shared lock on the marker file, repositories which are in use by any run are not removed.
+    """
+
+    MARKER = 'complete.json'
+
+    def __init__(self, path, max_size):
+        """
+        :param str path: cache directory, created if it does not exist
+        :param int max_size: maximum summed size of the extracted repositories in bytes
+        """
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._path = path
+        self._max_size = max_size
+        self._leases = {}
+        os.makedirs(path, exist_ok=True)
+
+    def _lease(self, key, marker_path):
+        """Mark the repository as in use by holding a shared lock on its marker file."""
+        if key not in self._leases.keys():
+            f = open(marker_path, 'r')
+            fcntl.flock(f, fcntl.LOCK_SH)
+            self._leases[key] = f
+
+    def release(self, key):
+        """The repository is no longer in use by this run."""
+        f = self._leases.pop(key, None)
+        if f is not None:
+            f.close()
+
+    def close(self):
+        """Release all repositories of this run."""
+        for key in list(self._leases.keys()):
+            self.release(key)
+
+    def _read_marker(self, entry):
+        try:
+            with open(os.path.join(self._path, entry, self.MARKER), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key):
+        """Return the path of the extracted repository for key or None if it is not in the cache."""
+        marker = self._read_marker(key)
+        if marker is None or marker['key'] != key:
+            return None
+
+        path = os.path.join(self._path, key, 'data', marker['repository'])
+        if not os.path.isdir(os.path.join(path, '.git')):
+            return None
+
+        # mark as recently used and in use
+        try:
+            self._lease(key, os.path.join(self._path, key, self.MARKER))
+        except FileNotFoundError:
+            return None
+        os.utime(os.path.join(self._path, key, self.MARKER))
+        return os.path.join(path, '')
+
+    def put(self, key, extract):
+        """Extract a repository into the cache.
+
+        :param str key: key of the repository
+        :param extract: function which extracts the repository into the given directory and returns the path of the repository
+        :returns: path of the extracted repository
+        """
+        tmp_path = tempfile.mkdtemp(prefix='.{}-'.format(key), dir=self._path)
+        try:
+            data_path = os.path.join(tmp_path, 'data')
+            os.mkdir(data_path)
+            repository = os.path.relpath(extract(data_path), data_path)
+
+            size = 0
+            for root, dirs, files in os.walk(data_path):
+                size += sum(os.lstat(os.path.join(root, name)).st_size for name in files)
+
+            with open(os.path.join(tmp_path, self.MARKER), 'w') as f:
+                json.dump({'key': key, 'repository': repository, 'size': size}, f)
+
+            # the lease is kept when the directory is renamed so that it can not be removed in between
+            self._lease(key, os.path.join(tmp_path, self.MARKER))
+
+            try:
+                os.rename(tmp_path, os.path.join(self._path, key))
+            except OSError:
+                # another run extracted the same repository in the meantime or an incomplete entry is in the way
+                self.release(key)
+                if self.get(key) is None:
+                    shutil.rmtree(os.path.join(self._path, key), ignore_errors=True)
+                    os.rename(tmp_path, os.path.join(self._path, key))
+                    self._lease(key, os.path.join(self._path, key, self.MARKER))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        self._evict(key)
+        return self.get(key)
+
+    def _evict(self, keep):
+        """Remove the least recently used repositories until the cache fits into max_size.
+
+        keep and repositories which are in use by any run are never removed.
+        """
+        entries = []
+        total = 0
+        for entry in os.listdir(self._path):
+            # left over from runs which were killed during the extraction
+            if entry.startswith('.') and os.path.getmtime(os.path.join(self._path, entry)) < time.time() - 24 * 60 * 60:
+                shutil.rmtree(os.path.join(self._path, entry), ignore_errors=True)
+                continue
+
+            marker = self._read_marker(entry)
+            if marker is None:
+                continue
+            total += marker['size']
+            entries.append((os.path.getmtime(os.path.join(self._path, entry, self.MARKER)), entry, marker['size']))
+
+        for _, entry, size in sorted(entries):
+            if total <= self._max_size:
+                break
+            if entry == keep or entry in self._leases.keys():
+                continue
+
+            try:
+                f = open(os.path.join(self._path, entry, self.MARKER), 'r')
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    self._log.info('keeping repository %s in the repository cache, it is in use', entry)
+                    continue
+                self._log.info('removing repository %s from the repository cache', entry)
+                shutil.rmtree(os.path.join(self._path, entry), ignore_errors=True)
+            total -= size
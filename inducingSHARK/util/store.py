@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides an optional persistent cache for information which only depends on the immutable git history.
+"""
+
+import os
+import pickle
+import sqlite3
+import zlib
+
+
+class GitStore(object):
+    """SQLite backed cache for the commit graph and the hunks of commits between runs.
+
+    The commit graph is stored together with the targets of the references it was built from. If the targets did
+    not change the graph is used as is. Otherwise the most recent graph whose reference targets all exist in the repository
+    is used as a starting point, it only has to be extended by the new commits.
+    Commits of references which were deleted in the meantime stay in the graph in this case.
+
+    Hunks are stored by a key which contains everything the hunks depend on, i.e., commit, parents and diff options.
+    Commits are unique between repositories, therefore one cache directory can be used for multiple repositories.
+    Every write is its own transaction so that multiple worker processes can share the cache.
+    """
+
+    def __init__(self, path, max_graphs=5):
+        """
+        :param str path: cache directory, created if it does not exist
+        :param int max_graphs: number of commit graphs which are kept, e.g., one per repository
+        """
+        os.makedirs(path, exist_ok=True)
+        self._max_graphs = max_graphs
+        self._db = sqlite3.connect(os.path.join(path, 'git.sqlite'), timeout=60, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS graph (id INTEGER PRIMARY KEY AUTOINCREMENT, tips TEXT UNIQUE, data BLOB)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS hunks (key TEXT PRIMARY KEY, data BLOB)')
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _dumps(value):
+        return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    @staticmethod
+    def _loads(data):
+        return pickle.loads(zlib.decompress(data))
+
+    def load_graph(self, tips, exists):
+        """Return the stored commit graph for the reference targets.
+
+        :param list tips: sorted revision hashes of all reference targets
+        :param exists: function which returns True if a revision hash exists in the repository
+        :rtype: tuple
+        :returns: (graph, complete), complete is False if the graph was built for other reference targets and has to be extended,
+                  graph is None if there is no usable graph
+        """
+        row = self._db.execute('SELECT data FROM graph WHERE tips = ?', ('\n'.join(tips),)).fetchone()
+        if row is not None:
+            return self._loads(row[0]), True
+
+        for stored_tips, data in self._db.execute('SELECT tips, data FROM graph ORDER BY id DESC'):
+            if all(exists(revision_hash) for revision_hash in stored_tips.split('\n')):
+                return self._loads(data), False
+        return None, False
+
+    def save_graph(self, tips, graph):
+        """Store the commit graph for the reference targets, only the most recent max_graphs graphs are kept."""
+        self._db.execute('INSERT OR REPLACE INTO graph (tips, data) VALUES (?, ?)', ('\n'.join(tips), self._dumps(graph)))
+        self._db.execute('DELETE FROM graph WHERE id NOT IN (SELECT id FROM graph ORDER BY id DESC LIMIT ?)', (self._max_graphs,))
+
+    def get_hunks(self, key):
+        """Return the stored hunks for key or None."""
+        row = self._db.execute('SELECT data FROM hunks WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._loads(row[0])
+
+    def put_hunks(self, key, hunks):
+        self._db.execute('INSERT OR REPLACE INTO hunks (key, data) VALUES (?, ?)', (key, self._dumps(hunks)))
+
+    def stats(self):
+        """Return hit/miss statistics of the hunks."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides the classification of suspect changes into hard and weak suspects.
+"""
+
+from collections import Counter
+
+
+def classify_suspects(all_changes):
+    """Distinguish between hard and weak suspects.
+
+    Every suspect starts as hard_suspect. If there is another change for the same inducing FileAction which is not a suspect
+    (which means it has to be a partial-fix or inducing) the suspect is a weak_suspect.
+    The changes are grouped by inducing FileAction first so that this runs in linear time.
+
+    :param dict all_changes: changes with at least inducing_file_action and szz_type
+    :rtype: dict
+    :returns: the new szz_type for the key of every change with szz_type suspect
+    """
+    non_suspects = Counter(values['inducing_file_action'] for values in all_changes.values() if values['szz_type'] != 'suspect')
+
+    new_types = {}
+    for change, values in all_changes.items():
+        if values['szz_type'] != 'suspect':
+            continue
+
+        szz_type = 'hard_suspect'
+        if non_suspects[values['inducing_file_action']] > 0:
+            szz_type = 'weak_suspect'
+        new_types[change] = szz_type
+    return new_types
+
+
+def unclassified_type(szz_type):
+    """Return the szz_type of a written change before the classification, i.e., suspect for hard and weak suspects."""
+    if szz_type in ('hard_suspect', 'weak_suspect'):
+        return 'suspect'
+    return szz_type
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+This module provides a batched writer for the induces lists of FileActions.
+"""
+
+import logging
+from collections import OrderedDict
+
+from pymongo import UpdateOne
+
+
+class InducingWriter(object):
+    """Collect induces entries per inducing FileAction and write them with batched $addToSet updates.
+
+    Instead of loading and saving every FileAction we group the entries by the inducing FileAction and send
+    one update per FileAction. The updates are send as unordered bulk operations of batch_size updates.
+    $addToSet only adds entries which are not already in the list, therefore re-running with the same results
+    does not create duplicates.
+
+    With replace_label all entries with this label are removed from the FileAction before the new entries are added,
+    i.e., the entries of the label are replaced. The entries are only removed the first time a FileAction is written so that
+    entries of the same FileAction which end up in a later batch do not remove the ones written before.
+    """
+
+    def __init__(self, collection, batch_size=1000, replace_label=None):
+        """
+        :param collection: pymongo collection of the FileActions, e.g., FileAction._get_collection()
+        :param int batch_size: number of FileAction updates send in one bulk operation
+        :param str replace_label: label of the entries which are replaced
+        """
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._collection = collection
+        self._batch_size = batch_size
+        self._replace_label = replace_label
+        self._pending = OrderedDict()
+        self._replaced = set()
+
+        self.entries = 0
+        self.updates = 0
+        self.modified = 0
+
+    def add(self, file_action_id, entry):
+        """Add one entry to the induces list of the FileAction file_action_id."""
+        self.touch(file_action_id)
+        self._pending[file_action_id].append(entry)
+        self.entries += 1
+
+    def touch(self, file_action_id):
+        """Update the FileAction even without entries, with replace_label this removes its entries of the label."""
+        if file_action_id not in self._pending.keys():
+            if len(self._pending) >= self._batch_size:
+                self.flush()
+            self._pending[file_action_id] = []
+
+    def flush(self):
+        """Write all pending entries."""
+        if not self._pending:
+            return
+
+        ops = []
+        for file_action_id, entries in self._pending.items():
+            if self._replace_label is not None and file_action_id not in self._replaced:
+                ops.append(UpdateOne({'_id': file_action_id}, {'$pull': {'induces': {'label': self._replace_label}}}))
+                self._replaced.add(file_action_id)
+            if entries:
+                ops.append(UpdateOne({'_id': file_action_id}, {'$addToSet': {'induces': {'$each': entries}}}))
+
+        # removing has to happen before adding
+        res = self._collection.bulk_write(ops, ordered=self._replace_label is not None)
+
+        self.updates += len(ops)
+        self.modified += res.modified_count
+        self._log.debug('wrote %s updates, %s modified', len(ops), res.modified_count)
+        self._pending = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
@@ -12,12 +12,13 @@ setup(
     name='inducingSHARK',
     version='1.1.0',
     description='Find bug-inducing commits.',
-    install_requires=['pycoshark>=1.3.1', 'pygit2==0.26.2', 'networkx>=2.2'],
+    install_requires=['pycoshark>=1.3.1', 'pygit2==0.26.2'],
     author='atrautsch',
     author_email='alexander.trautsch@stud.uni-goettingen.de',
     url='https://github.com/smartshark/inducingSHARK',
     download_url='https://github.com/smartshark/inducingSHARK/zipball/master',
     test_suite='tests',
+    tests_require=['mongomock'],
     packages=find_packages(),
     zip_safe=False,
     classifiers=[
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Micro-benchmarks for CollectGit, run with: python -m tests.bench_git"""
+
+import os
+import subprocess
+import tempfile
+import timeit
+
+from inducingSHARK.util.git import CollectGit
+from inducingSHARK.util.java import comment_only_change
+from tests.test_java import regex_comment_only_change
+
+
+def create_mass_deletion_repo(path, lines=12000):
+    """Create a repository with one commit that deletes (changes) every line of a large file."""
+    subprocess.run(['git', 'init', '-q'], cwd=path, check=True)
+    subprocess.run(['git', 'config', 'user.name', 'Test User'], cwd=path, check=True)
+    subprocess.run(['git', 'config', 'user.email', 'test@test.local'], cwd=path, check=True)
+
+    with open(os.path.join(path, 'Test.java'), 'w') as f:
+        f.write('\n'.join('    int a{} = "{}".length(); // comment'.format(i, i) for i in range(lines)) + '\n')
+    subprocess.run(['git', 'add', 'Test.java'], cwd=path, check=True)
+    subprocess.run(['git', 'commit', '-q', '-m', 'init'], cwd=path, check=True)
+
+    with open(os.path.join(path, 'Test.java'), 'w') as f:
+        f.write('\n'.join('    int b{} = {};'.format(i, i) for i in range(lines)) + '\n')
+    subprocess.run(['git', 'commit', '-q', '-a', '-m', 'change all'], cwd=path, check=True)
+
+    return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=path, check=True, stdout=subprocess.PIPE).stdout.decode('utf-8').strip()
+
+
+def create_history_repo(path, commits=100000, branches=10, tags=100):
+    """Create a repository with a long history, branches which are merged back and tags with git fast-import."""
+    subprocess.run(['git', 'init', '-q'], cwd=path, check=True)
+
+    stream = []
+    for i in range(1, commits + 1):
+        branch = 'master' if i % 100 else 'branch{}'.format(i // 100 % branches)
+        stream.append('commit refs/heads/{}\nmark :{}\ncommitter Test User <test@test.local> {} +0000\ndata 0\n'.format(branch, i, 1500000000 + i))
+        if i > 1:
+            stream.append('from :{}\n'.format(i - 1))
+        if branch == 'master' and i % 100 == 1 and i > 100:
+            stream.append('merge :{}\n'.format(i - 2))
+        stream.append('M 644 inline Test.java\ndata {}\n{}\n'.format(len(str(i)), i))
+        if i % (commits // tags) == 0:
+            stream.append('tag v{}\nfrom :{}\ntagger Test User <test@test.local> {} +0000\ndata 0\n'.format(i, i, 1500000000 + i))
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=path, check=True, input=''.join(stream).encode('utf-8'))
+
+
+def bench_collect(commits=100000, number=1):
+    """Build the commit graph of a repository with a long history."""
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        create_history_repo(tmpdirname, commits)
+
+        def collect():
+            cg = CollectGit(tmpdirname)
+            cg.collect()
+            return cg
+        t = timeit.timeit(collect, number=number)
+        print('collect {} commits: {:.4f}s'.format(commits, t / number))
+
+
+def bench_blame_lines(lines=12000, number=3):
+    """Line filtering of _blame_lines for one hunk with many deleted lines, strategy all skips the comment detection."""
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        revision_hash = create_mass_deletion_repo(tmpdirname, lines)
+
+        cg = CollectGit(tmpdirname)
+        cg.collect()
+
+        ignore_lines = [(i, i + 2) for i in range(1, lines, 7)]
+        validated_bugfix_lines = list(range(1, lines, 2))
+
+        for name, kwargs in [('no filters', {}),
+                             ('ignore_lines', {'ignore_lines': ignore_lines}),
+                             ('validated_bugfix_lines', {'validated_bugfix_lines': validated_bugfix_lines}),
+                             ('both', {'ignore_lines': ignore_lines, 'validated_bugfix_lines': validated_bugfix_lines})]:
+            t = timeit.timeit(lambda: cg._blame_lines(revision_hash, 'Test.java', 'all', **kwargs), number=number)
+            print('_blame_lines {} deleted lines, {}: {:.4f}s'.format(lines, name, t / number))
+
+
+def bench_comment_only_change(sizes=(1000, 2000, 4000, 8000), number=1):
+    """Comment detection for one hunk which changes every line, every line contains a string literal and a comment."""
+    for lines in sizes:
+        content = ''.join('-    int a{} = "{}".length(); // comment\n'.format(i, i) for i in range(lines))
+        content += ''.join('+    int b{} = {}; /* comment */\n'.format(i, i) for i in range(lines))
+
+        for name, func in [('regex', regex_comment_only_change), ('util.java', comment_only_change)]:
+            t = timeit.timeit(lambda: func(content), number=number)
+            print('comment_only_change {} changed lines, {}: {:.4f}s'.format(lines, name, t / number))
+
+
+if __name__ == '__main__':
+    bench_collect()
+    bench_comment_only_change()
+    bench_blame_lines()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic project for tests of the InducingMiner: a generated git repository and the matching commits, FileActions, hunks,
+issues and tags in a mongomock database.
+"""
+
+import contextlib
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import unittest.mock
+
+import mongoengine
+from mongoengine.connection import get_db
+from bson import ObjectId
+
+from pycoshark.mongomodels import Project, VCSSystem, IssueSystem, Issue, Commit, FileAction, File, Hunk, Refactoring, Tag
+
+# inducing.py uses the imports of the plugin
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'inducingSHARK'))
+import inducing  # noqa: E402
+
+
+# the configurations with all parameters as mine_bug_inducing expects them
+CONFIGURATIONS = [dict(inducing.DEFAULT_CONFIGURATION, **c) for c in [
+    dict(label='adjustedszz_bugfix', inducing_strategy='all', java_only=False, affected_versions=False, ignore_refactorings=False, name='SZZ'),
+    dict(label='issueonly_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=True, name='JL+R'),
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=True, ignore_refactorings=False, name='JLMIV+AV'),
+    dict(label='validated_bugfix', inducing_strategy='code_only', java_only=True, affected_versions=False, ignore_refactorings=False, name='JLMIVLV', only_validated_bugfix_lines=True),
+]]
+
+LABELS = ['validated_bugfix', 'adjustedszz_bugfix', 'issueonly_bugfix', 'issuefasttext_bugfix']
+WORDS = ['int a = 1;', 'return b;', '// comment', '/* block */', 'String s = "// x";', 'foo();', '', '    ', '* doc', 'x++;', 'if (a) {', '}']
+
+_connected = False
+
+
+def connect():
+    """Connect mongoengine to an empty mongomock database."""
+    global _connected
+    if not _connected:
+        mongoengine.connect('inducing_test', host='mongomock://localhost')
+        _connected = True
+    db = get_db()
+    for name in db.list_collection_names():
+        db.drop_collection(name)
+
+
+class _Ids(object):
+    """Deterministic ObjectIds so that the same seed creates the same database."""
+
+    def __init__(self):
+        self._count = 0
+
+    def __call__(self):
+        self._count += 1
+        return ObjectId('%024x' % self._count)
+
+
+def create_project(path, seed=1, commits=40):
+    """Create the git repository in path and the database of the project.
+
+    :returns: (repository path, project name, vcs url)
+    """
+    connect()
+    rnd = random.Random(seed)
+    oid = _Ids()
+
+    def git(*args, env=None):
+        return subprocess.run(['git'] + list(args), cwd=path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, check=True).stdout.decode('utf-8')
+
+    git('init', '-q')
+    git('config', 'user.name', 'Test')
+    git('config', 'user.email', 'test@example.com')
+
+    files = {name: ['line {} {}'.format(i, rnd.choice(WORDS)) for i in range(30)] for name in ['src/Foo.java', 'src/Bar.java', 'baz.py', 'src/Qux.java']}
+    base = datetime.datetime(2018, 1, 1)
+    for i in range(commits):
+        if i > 0:
+            for name in rnd.sample(sorted(files), rnd.randint(1, 3)):
+                lines = files[name]
+                for _ in range(rnd.randint(1, 6)):
+                    op = rnd.random()
+                    pos = rnd.randrange(len(lines))
+                    if op < 0.5:
+                        lines[pos] = 'c{} {}'.format(i, rnd.choice(WORDS))
+                    elif op < 0.7:
+                        lines.insert(pos, 'n{} {}'.format(i, rnd.choice(WORDS)))
+                    elif op < 0.85 and len(lines) > 5:
+                        del lines[pos]
+                    else:
+                        lines[pos] = '    ' + lines[pos] + ' '
+            if i == 20:
+                files['src/Quux.java'] = files.pop('src/Qux.java')
+                git('mv', 'src/Qux.java', 'src/Quux.java')
+
+        for name, lines in files.items():
+            os.makedirs(os.path.join(path, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(path, name), 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+        git('add', '-A')
+        date = (base + datetime.timedelta(days=i)).strftime('%Y-%m-%d %H:%M:%S +0000')
+        git('commit', '-q', '-m', 'c{}'.format(i), env=dict(os.environ, GIT_COMMITTER_DATE=date, GIT_AUTHOR_DATE=date))
+        if i == 10:
+            git('tag', '-a', '1.0', '-m', 'v1')
+        if i == 25:
+            git('tag', '2.0')
+
+    project = Project(id=oid(), name='proj').save()
+    vcs = VCSSystem(id=oid(), project_id=project.id, url='http://example.com/proj.git', repository_type='git').save()
+    its = IssueSystem(id=oid(), project_id=project.id, url='http://jira/rest?project=PROJ').save()
+
+    issues = []
+    for k in range(15):
+        issues.append(Issue(id=oid(), issue_system_id=its.id, external_id='PROJ-{}'.format(k),
+                            created_at=base + datetime.timedelta(days=rnd.randint(0, commits)),
+                            issue_type=rnd.choice(['Bug', 'Bug', 'Improvement']),
+                            status=rnd.choice(['closed', 'closed', 'closed', 'open']), resolution=rnd.choice(['fixed', 'fixed', None]),
+                            issue_type_verified=rnd.choice(['bug', 'bug', None]),
+                            affects_versions=rnd.choice([['1.0'], ['2.0'], [], ['v1'], ['1.0', '2.0']])).save())
+
+    file_ids = {}
+    commit_ids = {}
+    revisions = git('log', '--reverse', '--format=%H').split()
+    for i, rev in enumerate(revisions):
+        labels = {label: rnd.random() < 0.5 for label in LABELS} if i > 0 else {}
+        c = Commit(id=oid(), vcs_system_id=vcs.id, revision_hash=rev, parents=[revisions[i - 1]] if i else [],
+                   committer_date=base + datetime.timedelta(days=i), labels=labels,
+                   fixed_issue_ids=[x.id for x in rnd.sample(issues, rnd.randint(0, 2))],
+                   szz_issue_ids=[x.id for x in rnd.sample(issues, rnd.randint(0, 2))],
+                   linked_issue_ids=[x.id for x in rnd.sample(issues, rnd.randint(0, 2))]).save()
+        commit_ids[rev] = c.id
+
+        if i == 0:
+            status = git('show', '--name-status', '--format=', rev)
+        else:
+            status = git('diff', '--name-status', '-M', revisions[i - 1], rev)
+        for line in status.strip().split('\n'):
+            parts = line.split('\t')
+            mode, name = parts[0][0], parts[-1]
+            if name not in file_ids:
+                file_ids[name] = File(id=oid(), vcs_system_id=vcs.id, path=name).save().id
+            fa = FileAction(id=oid(), commit_id=c.id, file_id=file_ids[name], mode=mode).save()
+            if mode == 'M':
+                _create_hunks(rnd, oid, c, fa, git('diff', '-U0', revisions[i - 1], rev, '--', name))
+
+    Tag(id=oid(), name='1.0', commit_id=commit_ids[revisions[10]], vcs_system_id=vcs.id).save()
+    Tag(id=oid(), name='2.0', commit_id=commit_ids[revisions[25]], vcs_system_id=vcs.id).save()
+    return path, project.name, vcs.url
+
+
+def _create_hunks(rnd, oid, commit, fa, diff):
+    hunks = []
+    for line in diff.split('\n'):
+        if line.startswith('@@'):
+            header = line.split(' ')
+            old, new = header[1][1:].split(','), header[2][1:].split(',')
+            hunks.append({'old_start': int(old[0]), 'old_lines': int(old[1]) if len(old) > 1 else 1,
+                          'new_start': int(new[0]), 'new_lines': int(new[1]) if len(new) > 1 else 1, 'lines': []})
+        elif hunks and line[:1] in ('+', '-') and not line.startswith(('+++', '---')):
+            hunks[-1]['lines'].append(line)
+
+    for h in hunks:
+        verified = sorted(rnd.sample(range(len(h['lines'])), rnd.randint(0, len(h['lines']))))
+        hunk = Hunk(id=oid(), file_action_id=fa.id, old_start=h['old_start'], old_lines=h['old_lines'], new_start=h['new_start'],
+                    new_lines=h['new_lines'], content='\n'.join(h['lines']), lines_verified={'bugfix': verified}).save()
+        if rnd.random() < 0.4:
+            Refactoring(id=oid(), commit_id=commit.id, detection_tool='rMiner', type='test', hunks=[
+                {'hunk_id': hunk.id, 'mode': 'd', 'start_line': h['old_start'], 'end_line': h['old_start'] + rnd.randint(0, 2)},
+                {'hunk_id': hunk.id, 'mode': 'A', 'start_line': 1, 'end_line': 100}]).save()
+
+
+def change_labels(seed=99, probability=0.15):
+    """Flip bug-fixing labels of commits, some commits become bug-fixing commits and others lose the label."""
+    rnd = random.Random(seed)
+    for c in Commit.objects.order_by('id'):
+        if c.labels:
+            c.labels = {label: value if rnd.random() >= probability else not value for label, value in c.labels.items()}
+            c.save()
+
+
+def create_miner(repo_path, project_name, vcs_url):
+    """Return an InducingMiner for the synthetic project, the connection to the database is already established."""
+    with unittest.mock.patch.object(inducing, 'connect'):
+        return inducing.InducingMiner(logging.getLogger('inducingSHARK'), 'inducing_test', None, None, 'localhost', 27017, None, False, project_name, vcs_url, repo_path)
+
+
+@contextlib.contextmanager
+def fork_workers():
+    """Worker processes are forked in tests so that they share the mongomock database and the patched connect."""
+    fork = multiprocessing.get_context('fork')
+    with unittest.mock.patch.object(inducing, 'connect'), unittest.mock.patch.object(inducing.multiprocessing, 'get_context', lambda method=None: fork):
+        yield
+
+
+def induces():
+    """Return all induces entries of the FileActions in a comparable form."""
+    result = {}
+    for fa in FileAction.objects.order_by('id'):
+        if fa.induces:
+            result[str(fa.id)] = sorted(json.dumps(entry, sort_keys=True, default=str) for entry in fa.induces)
+    return result
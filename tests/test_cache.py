@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from inducingSHARK.util.cache import LRUCache
+
+
+class TestCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = LRUCache(3)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('c', 3)
+
+        # a is now the most recently used
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('d', 4)
+
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_size_bound(self):
+        cache = LRUCache(10, sizeof=len)
+        cache.put('a', 'xxxx')
+        cache.put('b', 'xxxx')
+        cache.put('c', 'xxxx')
+        self.assertEqual(cache.size, 8)
+        self.assertFalse('a' in cache)
+
+        # too large for the cache on its own
+        cache.put('d', 'x' * 11)
+        self.assertFalse('d' in cache)
+        self.assertEqual(cache.size, 8)
+
+    def test_stats(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.get('b')
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
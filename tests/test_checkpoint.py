@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import tempfile
+import unittest
+import zlib
+from collections import OrderedDict
+
+from bson import ObjectId
+
+from inducingSHARK.util.checkpoint import Checkpoint
+
+
+CONFIGURATIONS = [{'label': 'validated_bugfix', 'inducing_strategy': 'code_only', 'name': 'A'},
+                  {'label': 'adjustedszz_bugfix', 'inducing_strategy': 'all', 'name': 'B'}]
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def test_save_load(self):
+        processed = [ObjectId(), ObjectId()]
+        all_changes = {'A': OrderedDict(), 'B': OrderedDict()}
+        for szz_type in Checkpoint.SZZ_TYPES:
+            change, inducing = ObjectId(), ObjectId()
+            all_changes['A'][str(change) + '_' + str(inducing)] = {'change_file_action_id': change, 'inducing_file_action': inducing, 'label': 'validated_bugfix', 'szz_type': szz_type, 'inducing_strategy': 'code_only'}
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'checkpoint')
+            checkpoint = Checkpoint(path, interval=0)
+            self.assertTrue(checkpoint.due())
+            self.assertEqual(checkpoint.load('vcs', CONFIGURATIONS), None)
+
+            checkpoint.save('vcs', CONFIGURATIONS, processed, all_changes)
+            self.assertEqual(os.listdir(tmpdirname), ['checkpoint'])
+
+            loaded_processed, loaded_changes = Checkpoint(path).load('vcs', CONFIGURATIONS)
+            self.assertEqual(loaded_processed, processed)
+            self.assertEqual(loaded_changes, all_changes)
+            self.assertEqual(list(loaded_changes['A'].keys()), list(all_changes['A'].keys()))
+
+            # only for the same run
+            self.assertEqual(checkpoint.load('other', CONFIGURATIONS), None)
+            self.assertEqual(checkpoint.load('vcs', CONFIGURATIONS[:1]), None)
+
+            checkpoint.remove()
+            self.assertEqual(checkpoint.load('vcs', CONFIGURATIONS), None)
+
+    def test_no_pickle(self):
+        """Files of other machines are not unpickled."""
+        class Payload(object):
+            def __reduce__(self):
+                return (os.remove, (path,))
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'checkpoint')
+            with open(path, 'wb') as f:
+                f.write(zlib.compress(pickle.dumps(Payload())))
+
+            with self.assertRaises(ValueError):
+                Checkpoint(path).load('vcs', CONFIGURATIONS)
+            self.assertTrue(os.path.exists(path))
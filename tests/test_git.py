@@ -7,6 +7,11 @@ import tempfile
 import re
 
 from inducingSHARK.util.git import CollectGit
+from inducingSHARK.util.hunk import Hunk
+from inducingSHARK.util.java import strip_comments
+
+# the regular expression which was used to remove comments before util.java
+REGEX_COMMENT = re.compile(r"(//[^\"\n\r]*(?:\"[^\"\n\r]*\"[^\"\n\r]*)*[\r\n]|/\*([^*]|\*(?!/))*?\*/)(?=[^\"]*(?:\"[^\"]*\"[^\"]*)*$)")
 
 
 class TestGit(unittest.TestCase):
@@ -24,12 +29,14 @@ class TestGit(unittest.TestCase):
         ]
 
         for pos in positives:
-            a1 = re.findall(r"(//[^\"\n\r]*(?:\"[^\"\n\r]*\"[^\"\n\r]*)*[\r\n]|/\*([^*]|\*(?!/))*?\*/)(?=[^\"]*(?:\"[^\"]*\"[^\"]*)*$)", pos + "\n")
-            self.assertNotEqual(a1, [])
+            a1 = strip_comments(pos + "\n")
+            self.assertNotEqual(a1, pos + "\n")
+            self.assertEqual(a1, re.sub(REGEX_COMMENT, "", pos + "\n"))
 
         for neg in negatives:
-            a1 = re.findall(CollectGit._regex_comment, neg + "\n")
-            self.assertEqual(a1, [])
+            a1 = strip_comments(neg + "\n")
+            self.assertEqual(a1, neg + "\n")
+            self.assertEqual(re.findall(REGEX_COMMENT, neg + "\n"), [])
 
     # def test_excluding_file_regexes(self):
     #     positives = [
@@ -176,3 +183,84 @@ class TestGit(unittest.TestCase):
 
             self.assertEqual(len(commits), 1)  # we can only find one
             self.assertTrue(commits[0] not in [last, first])  # the middle commit introduced the bug
+
+    def test_blame_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            r = subprocess.run(['/bin/bash', './tests/scripts/repo_bug_introducing_simple2.sh', '{}'.format(tmpdirname)], stdout=subprocess.PIPE)
+            self.assertEqual(r.returncode, 0)
+
+            cg = CollectGit(tmpdirname)
+            cg.collect()
+
+            c = subprocess.run(['git', 'log', '--pretty=tformat:"%H %ci"'], cwd=tmpdirname, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.assertEqual(c.returncode, 0)
+            lines = c.stdout.decode('utf-8').split('\n')
+            last = lines[0].split(' ')[0].replace('"', '')
+
+            commits = cg.blame(last, 'test1.py')
+            self.assertEqual(cg.blame_cache_stats()['misses'], 1)
+
+            # a second call with additional filters is answered from the cache
+            self.assertEqual(sorted(cg.blame(last, 'test1.py')), sorted(commits))
+            self.assertEqual(cg.blame(last, 'test1.py', validated_bugfix_lines=[1]), [(lines[-2].split(' ')[0].replace('"', ''), 'test1.py')])
+            self.assertEqual(cg.blame_cache_stats()['hits'], 2)
+            self.assertEqual(cg.blame_cache_stats()['misses'], 1)
+
+            # nothing is blamed if no lines are left after filtering
+            self.assertEqual(cg.blame(last, 'test1.py', ignore_lines=[(1, 4)]), [])
+            self.assertEqual(cg.blame_cache_stats()['hits'], 2)
+
+    def test_blame_missing_lines(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            r = subprocess.run(['/bin/bash', './tests/scripts/repo_bug_introducing_simple2.sh', '{}'.format(tmpdirname)], stdout=subprocess.PIPE)
+            self.assertEqual(r.returncode, 0)
+
+            cg = CollectGit(tmpdirname)
+            cg.collect()
+
+            c = subprocess.run(['git', 'log', '--pretty=tformat:"%H %ci"'], cwd=tmpdirname, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.assertEqual(c.returncode, 0)
+            lines = c.stdout.decode('utf-8').split('\n')
+            last = lines[0].split(' ')[0].replace('"', '')
+
+            # the first call only blames line 1, the second call blames the remaining lines
+            self.assertEqual(cg.blame(last, 'test1.py', validated_bugfix_lines=[1]), [(lines[-2].split(' ')[0].replace('"', ''), 'test1.py')])
+            self.assertEqual(sorted(cg._blame_cache.get((last, 'test1.py')).keys()), [1])
+
+            commits = cg.blame(last, 'test1.py')
+            self.assertEqual(sorted(cg._blame_cache.get((last, 'test1.py')).keys()), sorted(lineno for lineno, line in cg._blame_lines(last, 'test1.py', 'code_only')))
+
+            cg2 = CollectGit(tmpdirname)
+            cg2.collect()
+            self.assertEqual(sorted(cg2.blame(last, 'test1.py')), sorted(commits))
+
+    def test_hunk_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            r = subprocess.run(['/bin/bash', './tests/scripts/repo_bug_introducing_simple2.sh', '{}'.format(tmpdirname)], stdout=subprocess.PIPE)
+            self.assertEqual(r.returncode, 0)
+
+            cg = CollectGit(tmpdirname)
+            cg.collect()
+
+            c = subprocess.run(['git', 'log', '--pretty=tformat:"%H %ci"'], cwd=tmpdirname, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.assertEqual(c.returncode, 0)
+            lines = c.stdout.decode('utf-8').split('\n')
+            last = lines[0].split(' ')[0].replace('"', '')
+
+            # the commit is only diffed once for different strategies and files
+            cg.blame(last, 'test1.py', 'code_only')
+            cg.blame(last, 'test1.py', 'all')
+            cg.blame(last, 'test2.py', 'all')
+
+            stats = cg.hunk_cache_stats()
+            self.assertEqual(stats['misses'], 1)
+            self.assertEqual(stats['hits'], 2)
+            self.assertEqual(stats['entries'], 1)
+            self.assertTrue(stats['size'] > 0)
+
+    def test_hunk(self):
+        h = Hunk('test1.py', 1, 2, 1, 3, '-aaaa\n+cccc\n-  bbbb  \n+cccc\n-\n')
+        self.assertEqual(list(h.deleted), [(1, 'aaaa'), (2, 'bbbb'), (3, '')])
+        self.assertEqual(h.new_file, 'test1.py')
+        self.assertFalse(h.comment_only)
+        self.assertTrue(h.size() > 0)
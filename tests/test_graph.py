@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import subprocess
+import tempfile
+import unittest
+
+from inducingSHARK.util.git import CollectGit
+from inducingSHARK.util.graph import CommitGraph
+
+
+class TestGraph(unittest.TestCase):
+
+    def test_commit_graph(self):
+        a, b, c, d = (bytes([i]) * 20 for i in range(1, 5))
+
+        graph = CommitGraph()
+        graph.add(b, [a])
+        graph.add(c, [a])
+        graph.add(d, [b, c])
+
+        self.assertEqual(len(graph), 4)
+        self.assertTrue(a.hex() in graph)
+        self.assertFalse('ff' * 20 in graph)
+        self.assertFalse('no hex' in graph)
+
+        self.assertEqual(graph.parents(d.hex()), [b.hex(), c.hex()])
+        self.assertEqual(graph.parents(b.hex()), [a.hex()])
+
+        # a is only known as a parent
+        self.assertEqual(graph.parents(a.hex()), [])
+        self.assertFalse(graph.walked(a))
+        self.assertTrue(graph.walked(b))
+
+        # adding a commit twice does not change its parents
+        graph.add(d, [a])
+        self.assertEqual(graph.parents(d.hex()), [b.hex(), c.hex()])
+
+    def test_collect(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            r = subprocess.run(['/bin/bash', './tests/scripts/repo_bug_introducing_simple2.sh', '{}'.format(tmpdirname)], stdout=subprocess.PIPE)
+            self.assertEqual(r.returncode, 0)
+
+            cg = CollectGit(tmpdirname)
+            graph = cg.collect()
+
+            c = subprocess.run(['git', 'log', '--all', '--pretty=tformat:%H %P'], cwd=tmpdirname, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.assertEqual(c.returncode, 0)
+            lines = c.stdout.decode('utf-8').strip().split('\n')
+
+            self.assertEqual(len(graph), len(lines))
+            for line in lines:
+                revision_hash, *parents = line.split()
+                self.assertTrue(revision_hash in graph)
+                self.assertEqual(graph.parents(revision_hash), parents)
+
+    def test_collect_tags(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            def git(*args):
+                return subprocess.run(['git'] + list(args), cwd=tmpdirname, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True).stdout.decode('utf-8').strip()
+
+            git('init', '-q')
+            git('config', 'user.name', 'Test User')
+            git('config', 'user.email', 'test@test.local')
+            git('commit', '-q', '--allow-empty', '-m', 'master')
+            git('tag', '-a', 'tree', '-m', 'tag of a tree', 'HEAD^{tree}')
+
+            # history which is only reachable from an annotated and a lightweight tag
+            git('checkout', '-q', '--orphan', 'annotated')
+            git('commit', '-q', '--allow-empty', '-m', 'annotated')
+            git('tag', '-a', 'v1', '-m', 'annotated tag')
+            git('tag', '-a', 'v1-nested', '-m', 'tag of a tag', 'v1')
+            annotated = git('rev-parse', 'HEAD')
+
+            git('checkout', '-q', '--orphan', 'lightweight')
+            git('commit', '-q', '--allow-empty', '-m', 'lightweight')
+            git('tag', 'v2')
+            lightweight = git('rev-parse', 'HEAD')
+
+            git('checkout', '-q', 'master')
+            git('branch', '-q', '-D', 'annotated', 'lightweight')
+
+            cg = CollectGit(tmpdirname)
+            graph = cg.collect()
+
+            self.assertEqual(len(graph), 3)
+            self.assertTrue(annotated in graph)
+            self.assertTrue(lightweight in graph)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from datetime import datetime
+
+from bson import ObjectId
+
+from inducingSHARK.util.index import CommitIndex
+
+
+class TestIndex(unittest.TestCase):
+
+    def test_commit_index(self):
+        index = CommitIndex(['validated_bugfix', 'issueonly_bugfix'])
+        cid = ObjectId()
+        dt = datetime(2018, 1, 3, 3, 1, 1, 123000)
+        index.add('a' * 40, cid, dt, {'validated_bugfix': True, 'issueonly_bugfix': False, 'other': True})
+        index.add('b' * 40, ObjectId(), None, None)
+
+        c = index.get('a' * 40)
+        self.assertEqual(c.id, cid)
+        self.assertEqual(c.committer_date, dt)
+        self.assertEqual(c.labels, {'validated_bugfix': True})
+
+        c = index.get('b' * 40)
+        self.assertEqual(c.committer_date, None)
+        self.assertEqual(c.labels, {})
+
+        self.assertEqual(len(index), 2)
+        self.assertTrue('a' * 40 in index)
+        with self.assertRaises(KeyError):
+            index.get('c' * 40)
+
+    def test_commit_index_fallback(self):
+        cid = ObjectId()
+        dt = datetime(1969, 12, 31, 23, 59, 59)
+        index = CommitIndex(['validated_bugfix'], fallback=lambda revision_hash: (cid, dt, {'validated_bugfix': True}))
+
+        c = index.get('c' * 40)
+        self.assertEqual(c, (cid, dt, {'validated_bugfix': True}))
+        self.assertEqual(index.fallbacks, 1)
+
+        # the second lookup is answered by the index
+        index.get('c' * 40)
+        self.assertEqual(index.fallbacks, 1)
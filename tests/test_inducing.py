@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import argparse
+import multiprocessing
+import tempfile
+import unittest
+import unittest.mock
+import zlib
+from collections import Counter
+
+from bson import ObjectId
+from mongoengine.connection import get_db
+
+from inducingSHARK.util.checkpoint import Checkpoint
+from tests.mining import CONFIGURATIONS, change_labels, create_project, create_miner, fork_workers, induces, inducing
+import smartshark_plugin
+
+
+class TestInducing(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.project = create_project(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def mine(self, **kwargs):
+        im = create_miner(*self.project)
+        im.collect()
+        return im.mine_bug_inducing(CONFIGURATIONS, **kwargs)
+
+    def test_workers(self):
+        """The changes do not depend on the number of worker processes."""
+        all_changes = self.mine(processes=1)
+        self.assertTrue(any(all_changes.values()))
+
+        with fork_workers():
+            all_changes_workers = self.mine(processes=2)
+        self.assertEqual(all_changes_workers, all_changes)
+        self.assertEqual([list(changes.keys()) for changes in all_changes_workers.values()], [list(changes.keys()) for changes in all_changes.values()])
+
+    def write(self, incremental=False, clear=True):
+        im = create_miner(*self.project)
+        im.collect(clear=clear and not incremental)
+        mined = []
+        mine_commit = im._mine_commit
+
+        def counting(bugfix_commit_id, configurations):
+            mined.append(bugfix_commit_id)
+            return mine_commit(bugfix_commit_id, configurations)
+
+        with unittest.mock.patch.object(im, '_mine_commit', counting):
+            im.write_bug_inducing_multi(CONFIGURATIONS, write_batch_size=3, incremental=incremental)
+        return mined
+
+    def test_incremental(self):
+        """An incremental run after labels changed gives the same result as a complete run."""
+        mined_all = self.write()
+        before = induces()
+
+        change_labels()
+        mined_new = self.write(incremental=True)
+        incremental = induces()
+        self.assertLess(len(mined_new), len(mined_all))
+
+        self.write()
+        self.assertEqual(incremental, induces())
+        self.assertNotEqual(incremental, before)
+
+        # removed bug-fixing commits and partial fixes which became suspects and vice versa
+        state = {doc['name']: doc for doc in get_db()[inducing.STATE_COLLECTION].find()}
+        self.assertTrue(set(mined_all) - set(state['SZZ']['commit_ids']))
+        self.assertIn('partial_fix', str(incremental))
+
+        # nothing changed
+        self.assertEqual(self.write(incremental=True), [])
+        self.assertEqual(incremental, induces())
+
+    def test_incremental_after_clear(self):
+        """Clearing removes the state, an interrupted complete run is not continued incrementally."""
+        self.write()
+        complete = induces()
+        self.assertTrue(complete)
+
+        create_miner(*self.project).collect()
+        self.assertEqual(induces(), {})
+        self.assertEqual(get_db()[inducing.STATE_COLLECTION].count_documents({}), 0)
+
+        self.write(incremental=True)
+        self.assertEqual(induces(), complete)
+
+    def test_resume(self):
+        """Resuming from the checkpoint of an interrupted run gives the same changes as an uninterrupted run."""
+        all_changes = self.mine()
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            checkpoint = Checkpoint(os.path.join(tmpdirname, 'checkpoint'), interval=0)
+
+            im = create_miner(*self.project)
+            im.collect()
+            mined = []
+            mine_commit = im._mine_commit
+
+            def crashing(bugfix_commit_id, configurations):
+                if len(mined) == 20:
+                    raise RuntimeError('killed')
+                mined.append(bugfix_commit_id)
+                return mine_commit(bugfix_commit_id, configurations)
+
+            with unittest.mock.patch.object(im, '_mine_commit', crashing):
+                with self.assertRaises(RuntimeError):
+                    im.mine_bug_inducing(CONFIGURATIONS, checkpoint=checkpoint)
+
+            resumed = []
+            im = create_miner(*self.project)
+            im.collect()
+            mine_commit = im._mine_commit
+
+            def counting(bugfix_commit_id, configurations):
+                resumed.append(bugfix_commit_id)
+                return mine_commit(bugfix_commit_id, configurations)
+
+            with unittest.mock.patch.object(im, '_mine_commit', counting):
+                resumed_changes = im.mine_bug_inducing(CONFIGURATIONS, checkpoint=checkpoint, resume=True)
+
+        # only the remaining commits are mined
+        self.assertEqual(len(mined), 20)
+        self.assertTrue(resumed)
+        self.assertFalse(set(mined) & set(resumed))
+        self.assertEqual(resumed_changes, all_changes)
+        self.assertEqual([list(changes.keys()) for changes in resumed_changes.values()], [list(changes.keys()) for changes in all_changes.values()])
+
+    def test_shard_of(self):
+        commit_ids = [ObjectId() for _ in range(1000)]
+        shards = [inducing.shard_of(commit_id, 4) for commit_id in commit_ids]
+        self.assertEqual(shards, [inducing.shard_of(commit_id, 4) for commit_id in commit_ids])
+        self.assertEqual(set(shards), {0, 1, 2, 3})
+        self.assertTrue(all(count > 150 for count in Counter(shards).values()))
+        self.assertEqual(inducing.shard_of(ObjectId('5c1f8b0e6a0b6c2e8c3f1a2b'), 4), zlib.crc32(bytes.fromhex('5c1f8b0e6a0b6c2e8c3f1a2b')) % 4)
+
+    def test_shard_argument(self):
+        self.assertEqual(smartshark_plugin.shard_argument('0/4'), (0, 4))
+        self.assertEqual(smartshark_plugin.shard_argument('3/4'), (3, 4))
+        for value in ['4/4', '-1/4', '1', 'a/b', '1/2/3']:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                smartshark_plugin.shard_argument(value)
+
+    def test_shards(self):
+        """Shards mined in separate processes and merged give the same result as a complete run."""
+        self.write()
+        complete = induces()
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            paths = [os.path.join(tmpdirname, 'shard_{}.bin'.format(shard)) for shard in range(3)]
+            processes = [multiprocessing.get_context('fork').Process(target=mine_shard, args=(self.project, shard, 3, paths[shard])) for shard in range(3)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+                self.assertEqual(process.exitcode, 0)
+
+            im = create_miner(*self.project)
+            with self.assertRaisesRegex(Exception, 'shards do not contain [0-9]+ bug-fixing commits'):
+                im.write_bug_inducing_shards(CONFIGURATIONS, paths[:2])
+            self.assertEqual(induces(), complete)
+
+            im.write_bug_inducing_shards(CONFIGURATIONS, paths, write_batch_size=3)
+            self.assertEqual(induces(), complete)
+
+
+def mine_shard(project, shard, shards, path):
+    im = create_miner(*project)
+    im.collect(clear=False)
+    im.mine_shard(CONFIGURATIONS, shard, shards, Checkpoint(path))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import re
+import unittest
+
+from inducingSHARK.util.java import strip_comments, comment_only_change
+
+REGEX_COMMENT = re.compile(r"(//[^\"\n\r]*(?:\"[^\"\n\r]*\"[^\"\n\r]*)*[\r\n]|/\*([^*]|\*(?!/))*?\*/)(?=[^\"]*(?:\"[^\"]*\"[^\"]*)*$)")
+REGEX_JDOC_LINE = re.compile(r"(- |\+)\s*(\*|/\*).*")
+
+
+def regex_comment_only_change(content):
+    """The regular expression based implementation which was used before util.java."""
+    content = content + '\n'
+    content = re.sub(REGEX_COMMENT, "", content)
+    removed = ''
+    added = ''
+    for line in content.split('\n'):
+        line = re.sub(r"\s+", " ", line, flags=re.UNICODE)
+        if not re.match(REGEX_JDOC_LINE, line):
+            if line.startswith('-'):
+                removed += line[1:].strip()
+            elif line.startswith('+'):
+                added += line[1:].strip()
+    return removed == added
+
+
+class TestJava(unittest.TestCase):
+
+    def test_strip_comments(self):
+        self.assertEqual(strip_comments('a(); // comment\nb();\n'), 'a(); b();\n')
+        self.assertEqual(strip_comments('a(); /* one\n two */ b();\n'), 'a();  b();\n')
+        self.assertEqual(strip_comments('a("// no comment"); /* "x" */\n'), 'a("// no comment"); \n')
+        self.assertEqual(strip_comments('a("\\" // no comment");\n'), 'a("\\" // no comment");\n')
+        self.assertEqual(strip_comments("c = '\"'; // comment\n"), "c = '\"'; ")
+        self.assertEqual(strip_comments("// it's\nd();\n"), "d();\n")
+        self.assertEqual(strip_comments(" * it's /* unclosed\n"), " * it's /* unclosed\n")
+
+    def test_comment_only_change(self):
+        self.assertTrue(comment_only_change('-/* old */\n+/* new */\n a();\n'))
+        self.assertTrue(comment_only_change('-  a(b,   c);\n+a(b, c);\n'))
+        self.assertTrue(comment_only_change('- * old javadoc\n+ * new javadoc\n'))
+        self.assertTrue(comment_only_change('-/* old */ a();\n+a(); /* new */\n'))
+        self.assertFalse(comment_only_change('-a();\n+b();\n'))
+        self.assertFalse(comment_only_change('-a(); // old\n+a(); // new\n b();\n'))  # the line break belongs to the comment
+
+    def test_same_as_regex(self):
+        # the regular expression only counts quotes, therefore there are no escaped quotes, quotes in char literals or strings in comments
+        pieces = ['x', 'int a = 1;', ' ', '\t', '// c', '/* b */', '"s"', '"//"', '"/*x*/"', '*', ' * doc', 'foo();', "'a'"]
+        rnd = random.Random(42)
+        for _ in range(2000):
+            lines = []
+            for _ in range(rnd.randint(1, 6)):
+                lines.append(rnd.choice('-+ ') + ''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 4))))
+            content = '\n'.join(lines) + '\n'
+            self.assertEqual(comment_only_change(content), regex_comment_only_change(content), content)
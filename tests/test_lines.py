@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from inducingSHARK.util.lines import LineIntervals
+
+
+class TestLines(unittest.TestCase):
+
+    def test_line_intervals(self):
+        intervals = LineIntervals([(10, 12), (1, 3), (4, 5), (11, 20), (30, 29)])
+        self.assertEqual(len(intervals), 2)  # 1-5 and 10-20, 30-29 is empty
+
+        for line in [1, 3, 4, 5, 10, 15, 20]:
+            self.assertTrue(line in intervals)
+        for line in [0, 6, 9, 21, 29, 30]:
+            self.assertFalse(line in intervals)
+
+        self.assertFalse(LineIntervals([]))
+
+    def test_same_as_linear_scan(self):
+        rnd = random.Random(42)
+        for _ in range(50):
+            ignore_lines = []
+            for _ in range(rnd.randint(0, 30)):
+                start_line = rnd.randint(0, 200)
+                ignore_lines.append((start_line, start_line + rnd.randint(-2, 10)))
+
+            intervals = LineIntervals(ignore_lines)
+            for line in range(-1, 220):
+                expected = any(start_line <= line <= end_line for start_line, end_line in ignore_lines)
+                self.assertEqual(line in intervals, expected)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import subprocess
+import tarfile
+import tempfile
+import unittest
+
+from inducingSHARK.util.repository import extract_archive, repository_path, RepositoryCache
+
+
+class StreamOnly(object):
+    """Non seekable file like object, like a GridFS file which is read chunk by chunk."""
+
+    def __init__(self, data, chunk_size=255 * 1024):
+        self._data = io.BytesIO(data)
+        self._chunk_size = chunk_size
+
+    def read(self, size=-1):
+        if size < 0 or size > self._chunk_size:
+            size = self._chunk_size
+        return self._data.read(size)
+
+
+def create_archive(path, arcname):
+    subprocess.run(['git', 'init', '-q', path], check=True)
+    with open(os.path.join(path, 'Test.java'), 'w') as f:
+        f.write('class Test {}\n')
+
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as tar:
+        tar.add(path, arcname=arcname)
+    return data.getvalue()
+
+
+class TestRepository(unittest.TestCase):
+
+    def test_extract_archive(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as target:
+            data = create_archive(os.path.join(source, 'repo'), 'my-repo')
+
+            top_level = extract_archive(StreamOnly(data), target)
+            self.assertEqual(top_level, {'my-repo'})
+            self.assertTrue(os.path.isdir(os.path.join(target, 'my-repo', '.git')))
+            self.assertTrue(os.path.isfile(os.path.join(target, 'my-repo', 'Test.java')))
+
+            self.assertEqual(repository_path(target, top_level), '{}/my-repo/'.format(target))
+
+    def test_repository_path(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as target:
+            data = create_archive(os.path.join(source, 'repo'), '.')
+
+            top_level = extract_archive(StreamOnly(data), target)
+            self.assertEqual(repository_path(target, top_level), '{}/'.format(target))
+
+        self.assertEqual(repository_path('/tmp/', set()), None)
+
+    def test_repository_cache(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as cache_dir:
+            data = create_archive(os.path.join(source, 'repo'), 'my-repo')
+            extracted = []
+
+            def extract(path):
+                extracted.append(path)
+                return repository_path(path, extract_archive(StreamOnly(data), path))
+
+            cache = RepositoryCache(cache_dir, 10 * 1024 * 1024)
+            self.assertEqual(cache.get('a'), None)
+
+            path = cache.put('a', extract)
+            self.assertEqual(path, os.path.join(cache_dir, 'a', 'data', 'my-repo', ''))
+            self.assertTrue(os.path.isfile(os.path.join(path, 'Test.java')))
+
+            # the second run reuses the repository
+            self.assertEqual(RepositoryCache(cache_dir, 10 * 1024 * 1024).get('a'), path)
+            self.assertEqual(len(extracted), 1)
+
+            # repositories without marker are incomplete
+            os.remove(os.path.join(cache_dir, 'a', RepositoryCache.MARKER))
+            self.assertEqual(cache.get('a'), None)
+            self.assertEqual(cache.put('a', extract), path)
+            self.assertEqual(len(extracted), 2)
+
+            # repositories which are in use by another run are not removed
+            small = RepositoryCache(cache_dir, 1)
+            small.put('b', extract)
+            self.assertEqual(sorted(os.listdir(cache_dir)), ['a', 'b'])
+
+            # the least recently used repository is removed if the cache is too large
+            cache.close()
+            small.release('b')
+            small.put('c', extract)
+            self.assertEqual(small.get('a'), None)
+            self.assertEqual(small.get('b'), None)
+            self.assertNotEqual(small.get('c'), None)
+            self.assertEqual(sorted(os.listdir(cache_dir)), ['c'])
+            small.close()
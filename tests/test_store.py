@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import subprocess
+import tempfile
+import unittest
+
+from inducingSHARK.util.git import CollectGit
+
+
+class TestStore(unittest.TestCase):
+
+    def test_cache_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdirname, tempfile.TemporaryDirectory() as cache_dir:
+            r = subprocess.run(['/bin/bash', './tests/scripts/repo_bug_introducing_simple2.sh', '{}'.format(tmpdirname)], stdout=subprocess.PIPE)
+            self.assertEqual(r.returncode, 0)
+
+            c = subprocess.run(['git', 'log', '--pretty=tformat:"%H %ci"'], cwd=tmpdirname, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.assertEqual(c.returncode, 0)
+            lines = c.stdout.decode('utf-8').split('\n')
+            last = lines[0].split(' ')[0].replace('"', '')
+
+            cg = CollectGit(tmpdirname, cache_dir=cache_dir)
+            graph = cg.collect()
+            commits = cg.blame(last, 'test1.py')
+            self.assertEqual(cg.hunk_cache_stats()['stored'], {'hits': 0, 'misses': 1})
+
+            # the second run uses the stored graph and hunks
+            cg2 = CollectGit(tmpdirname, cache_dir=cache_dir)
+            graph2 = cg2.collect()
+            self.assertEqual(len(graph2), len(graph))
+            self.assertEqual(graph2.parents(last), graph.parents(last))
+            self.assertEqual(sorted(cg2.blame(last, 'test1.py')), sorted(commits))
+            self.assertEqual(cg2.hunk_cache_stats()['stored'], {'hits': 1, 'misses': 0})
+
+            # a new commit extends the stored graph
+            subprocess.run(['git', 'commit', '-q', '--allow-empty', '-m', 'new'], cwd=tmpdirname, check=True)
+            new = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=tmpdirname, stdout=subprocess.PIPE, check=True).stdout.decode('utf-8').strip()
+
+            graph3 = CollectGit(tmpdirname, cache_dir=cache_dir).collect()
+            self.assertEqual(len(graph3), len(graph) + 1)
+            self.assertEqual(graph3.parents(new), [last])
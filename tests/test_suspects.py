@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+
+from inducingSHARK.util.suspects import classify_suspects, unclassified_type
+
+
+def classify_suspects_quadratic(all_changes):
+    """The previous implementation of the second pass from InducingMiner.write_bug_inducing."""
+    new_types = {}
+    for change, values in all_changes.items():
+
+        # every suspect starts as hard_suspect
+        szz_type = 'hard_suspect'
+        if values['szz_type'] == 'suspect':
+
+            # is there a fix for this change which is not a suspect (which means it has to be a partial-fix or inducing)
+            # we set this type to weak_suspect
+            for change2, values2 in all_changes.items():
+
+                # skip equal
+                if change == change2:
+                    continue
+
+                if values2['inducing_file_action'] == values['inducing_file_action'] and values2['szz_type'] != 'suspect':
+                    szz_type = 'weak_suspect'
+            new_types[change] = szz_type
+    return new_types
+
+
+class TestSuspects(unittest.TestCase):
+
+    def test_simple(self):
+        all_changes = {
+            'a_x': {'inducing_file_action': 'x', 'szz_type': 'suspect'},
+            'b_x': {'inducing_file_action': 'x', 'szz_type': 'inducing'},
+            'c_y': {'inducing_file_action': 'y', 'szz_type': 'suspect'},
+            'd_y': {'inducing_file_action': 'y', 'szz_type': 'suspect'},
+            'e_z': {'inducing_file_action': 'z', 'szz_type': 'suspect'},
+            'f_z': {'inducing_file_action': 'z', 'szz_type': 'partial_fix'},
+        }
+        new_types = classify_suspects(all_changes)
+        self.assertEqual(new_types['a_x'], 'weak_suspect')
+        self.assertEqual(new_types['c_y'], 'hard_suspect')
+        self.assertEqual(new_types['d_y'], 'hard_suspect')
+        self.assertEqual(new_types['e_z'], 'weak_suspect')
+
+    def test_same_as_quadratic(self):
+        rnd = random.Random(42)
+        for _ in range(20):
+            all_changes = {}
+            for i in range(rnd.randint(0, 500)):
+                inducing = rnd.randint(0, 50)
+                all_changes['{}_{}'.format(i, inducing)] = {'change_file_action_id': i,
+                                                            'inducing_file_action': inducing,
+                                                            'szz_type': rnd.choice(['suspect', 'suspect', 'inducing', 'partial_fix'])}
+
+            self.assertEqual(classify_suspects(all_changes), classify_suspects_quadratic(all_changes))
+
+    def test_reclassify_written(self):
+        """Classifying the written entries of one inducing FileAction again together with new changes gives the same types."""
+        rnd = random.Random(42)
+        for _ in range(20):
+            all_changes = {}
+            for i in range(rnd.randint(0, 200)):
+                inducing = rnd.randint(0, 20)
+                all_changes['{}_{}'.format(i, inducing)] = {'inducing_file_action': inducing, 'szz_type': rnd.choice(['suspect', 'suspect', 'inducing', 'partial_fix'])}
+            changes = list(all_changes.items())
+            old, new = dict(changes[:len(changes) // 2]), dict(changes[len(changes) // 2:])
+
+            new_types = classify_suspects(old)
+            written = {change: dict(values, szz_type=new_types.get(change, values['szz_type'])) for change, values in old.items()}
+
+            combined = {change: dict(values, szz_type=unclassified_type(values['szz_type'])) for change, values in written.items()}
+            combined.update(new)
+            self.assertEqual(classify_suspects(combined), classify_suspects(all_changes))
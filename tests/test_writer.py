@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import mongomock
+
+from inducingSHARK.util.writer import InducingWriter
+
+
+class TestWriter(unittest.TestCase):
+
+    def test_replace_label_batches(self):
+        collection = mongomock.MongoClient().db.file_action
+        for i in range(3):
+            collection.insert_one({'_id': i, 'induces': [{'change_file_action_id': 'old', 'szz_type': 'inducing', 'label': 'A'},
+                                                         {'change_file_action_id': 'old', 'szz_type': 'inducing', 'label': 'B'}]})
+
+        # the second entry of FileAction 0 is written in a later batch than the first one
+        with InducingWriter(collection, batch_size=2, replace_label='A') as writer:
+            for i in range(3):
+                writer.touch(i)
+            writer.add(0, {'change_file_action_id': 'x', 'szz_type': 'inducing', 'label': 'A'})
+            writer.add(1, {'change_file_action_id': 'x', 'szz_type': 'partial_fix', 'label': 'A'})
+            writer.add(0, {'change_file_action_id': 'y', 'szz_type': 'hard_suspect', 'label': 'A'})
+
+        induces = {fa['_id']: sorted((e['label'], e['change_file_action_id']) for e in fa['induces']) for fa in collection.find()}
+        self.assertEqual(induces[0], [('A', 'x'), ('A', 'y'), ('B', 'old')])
+        self.assertEqual(induces[1], [('A', 'x'), ('B', 'old')])
+        self.assertEqual(induces[2], [('B', 'old')])